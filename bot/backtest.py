@@ -1,66 +1,126 @@
 # Simple backward-looking evaluation of the rotation logic (paper only).
-import pandas as pd, numpy as np, json, time
+# Replays trade.main's regime -> selection -> weights pipeline at each
+# rebalance date and fills through the paper execution simulator.
+# Selection/weights per date and whole runs are memoized in bot.cache.
+import sys
+import pandas as pd
 from .utils import load_config, setup_logging
 from .exchange import make_client
 from .data import stack_closes
+from .markets import load_constraints, cache_settings
 from .quantum_alloc import select_assets
-from .strategy import equal_weights
+from .strategy import vol_target_weights
+from .regime import market_regime
+from .trade import _read_regime_knobs, _read_asset_regime, _apply_asset_regimes, USER_MIN_NOTIONAL
+from .cache import ResultCache, make_key, prefix_fingerprints, code_version
+from . import paper, quantum_alloc, strategy, features as features_mod, regime as regime_mod, rolling
+from .risk import risk_report, format_report
+from .features import FeatureStore
 
-def run_backtest():
-    log = setup_logging("INFO")
-    cfg = load_config("config.yml")
-    client = make_client(cfg["exchange"]["name"])
-    symbols = cfg["trading"]["symbols"]
-    closes = stack_closes(client, symbols, timeframe="1d", lookback_days=max(200, cfg["trading"]["lookback_days"]))
-    dates = closes.index
+INITIAL_EQUITY = 1000.0
+MIN_HISTORY = 30  # bars needed before the first rebalance
 
-    equity = 1000.0
-    cash_buffer = cfg["trading"]["cash_buffer_pct"]
-    max_positions = cfg["trading"]["max_positions"]
-    lam = cfg["trading"]["risk_aversion"]
-    min_w = cfg["trading"]["min_weight"]
-    max_w = cfg["trading"]["max_weight"]
-    rebalance_days = cfg["trading"]["rebalance_days"]
+def _backtest_params(cfg: dict) -> dict:
+    """The config subset a backtest result depends on."""
+    trading = cfg.get("trading") or {}
+    knobs, turnover_cap = _read_regime_knobs(trading)
+    ar_mode, ar_scales = _read_asset_regime(trading)
+    return {
+        "symbols": trading.get("symbols") or [],
+        "min_w": float(trading.get("min_weight", 0.05)),
+        "max_w": float(trading.get("max_weight", 0.6)),
+        "rebalance_days": int(trading.get("rebalance_days", 7)),
+        "lookback_days": int(trading.get("lookback_days", 90)),
+        "selection": trading.get("selection") or {},
+        "knobs": knobs,
+        "turnover_cap": turnover_cap,
+        "asset_regime": (ar_mode, ar_scales),
+        "paper": cfg.get("paper") or {},
+    }
 
-    last_reb = None
-    weights = {s:0.0 for s in symbols}
+def _target_weights(closes, fps, params, cache, version, log):
+    """Target weights per rebalance date; each stage is memoized per date (fps[i] keys closes[:i+1])."""
+    symbols = params["symbols"]
+    sel_cfg = params["selection"]
+    rows, last_reb, prev, prev_chosen = {}, None, {}, None
+    for i, date in enumerate(closes.index):
+        if i + 1 <= MIN_HISTORY:
+            continue
+        if last_reb is not None and (date - last_reb).days < params["rebalance_days"]:
+            continue
+        # as in trade.main: regimes read all bars so far, selection/weights the last lookback_days
+        sub = closes.iloc[:i + 1]
+        win = sub.tail(params["lookback_days"])
+        features = FeatureStore(sub, window=len(win))
+        reg = market_regime(sub, benchmark="BTC/USD", features=features)
+        rk = params["knobs"][reg]
+        candidates, scale = _apply_asset_regimes(win, *params["asset_regime"], features=features, history=sub)
 
-    history = []
-    for i in range(len(dates)):
-        date = dates[i]
-        # Rebalance periodically
-        if last_reb is None or (date - last_reb).days >= rebalance_days:
-            sub = closes.iloc[:i+1]
-            if len(sub) > 30:
-                chosen = select_assets(sub, lam=lam, max_positions=max_positions)
-                weights = equal_weights(chosen, symbols, min_w=min_w, max_w=max_w, cash_buffer=cash_buffer)
-                last_reb = date
-                log.info(f"{date.date()} Rebalance -> {chosen}")
+        sel_key = make_key(fps[i], len(win), list(candidates.columns), sel_cfg, rk["max_positions"],
+                           rk["lam"], prev_chosen, version)
+        chosen = cache.memo("select", sel_key, lambda: select_assets(
+            candidates, max_positions=rk["max_positions"], lam=rk["lam"], selection_cfg=sel_cfg,
+            warm_start=prev_chosen, features=features, cache=cache))
 
-        if i == 0: 
-            history.append((date, equity))
-            continue
+        w_key = make_key(fps[i], len(win), chosen, params["min_w"], params["max_w"], rk["cash_buffer"],
+                         params["turnover_cap"], prev, scale, version)
+        weights = cache.memo("weights", w_key, lambda: vol_target_weights(
+            win, selected=chosen, all_symbols=symbols, min_w=params["min_w"],
+            max_w=params["max_w"], cash_buffer=rk["cash_buffer"],
+            turnover_cap=params["turnover_cap"], prev_weights=prev, asset_scale=scale,
+            features=features))
+
+        rows[date] = weights
+        prev, prev_chosen, last_reb = weights, chosen, date
+        log.info(f"{date.date()} Rebalance ({reg}) -> {chosen}")
+    return pd.DataFrame.from_dict(rows, orient="index", columns=symbols)
+
+def run_backtest(closes: pd.DataFrame = None, cfg: dict = None, snapshot: dict = None,
+                 cache: ResultCache = None, initial_equity: float = INITIAL_EQUITY):
+    log = setup_logging("INFO")
+    cfg = cfg or load_config("config.yml")
+    params = _backtest_params(cfg)
+    symbols = params["symbols"]
+    cache = cache or ResultCache.from_config(cfg)
+
+    if closes is None or snapshot is None:
+        client = make_client((cfg.get("exchange") or {}).get("name", "kraken"))
+        if closes is None:
+            lookback = max(200, int((cfg.get("trading") or {}).get("lookback_days", 90)))
+            closes = stack_closes(client, symbols, timeframe="1d", lookback_days=lookback)
+        if snapshot is None:
+            path, ttl = cache_settings(cfg)
+            snapshot = load_constraints(client, symbols, path=path, ttl_hours=ttl)
+    closes = closes[symbols]
+
+    version = code_version(quantum_alloc, strategy, regime_mod, rolling, features_mod, paper)
+    fps = prefix_fingerprints(closes)
+    run_version = code_version(quantum_alloc, strategy, regime_mod, rolling, features_mod, paper, sys.modules[__name__])
+    run_key = make_key(fps[-1] if fps else None, params, snapshot, initial_equity, run_version)
 
-        # Apply daily return
-        prev = closes.iloc[i-1]
-        today = closes.iloc[i]
-        # portfolio return (excluding cash buffer)
-        port_ret = 0.0
-        alloc_sum = sum(weights.values())
-        if alloc_sum > 0:
-            for s, w in weights.items():
-                if w > 0:
-                    r = (today[s] - prev[s]) / prev[s]
-                    port_ret += w * r
-        equity *= (1 + port_ret)
-        history.append((date, equity))
+    def _run():
+        tw = _target_weights(closes, fps, params, cache, version, log)
+        pc = params["paper"]
+        curve, fills = paper.simulate(
+            closes, tw, snapshot, initial_equity=initial_equity,
+            fee_rate=float(pc.get("fee_rate", 0.0026)),
+            slippage_bps=float(pc.get("slippage_bps", 5.0)),
+            min_notional=USER_MIN_NOTIONAL)
+        return curve.to_frame(), fills
 
-    df = pd.DataFrame(history, columns=["date","equity"]).set_index("date")
+    df, fills = cache.memo("backtest", run_key, _run)
+    eq = df["equity"]
     stats = {
-        "final_equity": float(df["equity"].iloc[-1]),
-        "return_pct": float((df["equity"].iloc[-1]/df["equity"].iloc[0]-1)*100.0),
-        "max_drawdown_pct": float(((df["equity"]/df["equity"].cummax()).min()-1)*100.0),
+        "final_equity": float(eq.iloc[-1]),
+        "return_pct": float((eq.iloc[-1]/eq.iloc[0]-1)*100.0),
+        "max_drawdown_pct": float(((eq/eq.cummax()).min()-1)*100.0),
+        "fees": float(fills["fees"].sum()) if len(fills) else 0.0,
     }
+    rep = risk_report(eq, traded=fills["traded"] if len(fills) else None)
+    stats.update({k: rep[k] for k in ("sharpe", "sortino", "var", "cvar", "max_dd_days", "turnover")})
+    for line in format_report(rep):
+        log.info(line)
+    log.info(f"cache hits={cache.hits} misses={cache.misses}")
     print(stats)
     return df, stats
 
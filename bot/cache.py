@@ -0,0 +1,125 @@
+# bot/cache.py
+# Content-addressed, size-bounded on-disk memo store for backtest/selection
+# results. Keys hash (closes fingerprint, config subset, code version).
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = "state/cache"
+DEFAULT_MAX_MB = 200.0
+
+_MISS = object()
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def make_key(*parts) -> str:
+    """Stable hash of JSON-able parts (dict keys sorted, floats repr'd exactly)."""
+    return _digest(json.dumps(parts, sort_keys=True, default=repr).encode())
+
+def prefix_fingerprints(closes: pd.DataFrame):
+    """
+    Fingerprint of closes.iloc[:i+1] for every i, as a hash chain over rows:
+    O(n) for the whole panel, and an unchanged prefix keeps its fingerprints
+    when new bars are appended.
+    """
+    rows = pd.util.hash_pandas_object(closes, index=True).to_numpy(dtype=np.uint64)
+    h = _digest(json.dumps([str(c) for c in closes.columns]).encode())
+    out = []
+    for r in rows:
+        h = _digest(h.encode() + r.tobytes())
+        out.append(h)
+    return out
+
+def fingerprint(closes: pd.DataFrame) -> str:
+    fps = prefix_fingerprints(closes)
+    return fps[-1] if fps else make_key([str(c) for c in closes.columns])
+
+def code_version(*modules) -> str:
+    """Hash of the source files of the given modules: edits invalidate their results."""
+    h = hashlib.sha256()
+    for m in modules:
+        h.update(pathlib.Path(m.__file__).read_bytes())
+    return h.hexdigest()[:16]
+
+class ResultCache:
+    """
+    Pickled values under path/<ns>/<key[:2]>/<key>.pkl. Reads touch the file's
+    mtime, and writes evict least-recently-used entries beyond max_mb.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_mb: float = DEFAULT_MAX_MB):
+        self.root = pathlib.Path(path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._index = None  # path -> [mtime, size], loaded lazily
+
+    @classmethod
+    def from_config(cls, cfg: dict):
+        c = (cfg or {}).get("cache") or {}
+        return cls(c.get("path", DEFAULT_PATH), float(c.get("max_mb", DEFAULT_MAX_MB)))
+
+    def _file(self, ns: str, key: str) -> pathlib.Path:
+        return self.root / ns / key[:2] / f"{key}.pkl"
+
+    def get(self, ns: str, key: str, default=None):
+        f = self._file(ns, key)
+        try:
+            value = pickle.loads(f.read_bytes())
+        except Exception:
+            self.misses += 1
+            return default
+        now = time.time()
+        os.utime(f, (now, now))
+        if self._index is not None and str(f) in self._index:
+            self._index[str(f)][0] = now
+        self.hits += 1
+        return value
+
+    def put(self, ns: str, key: str, value):
+        f = self._file(ns, key)
+        f.parent.mkdir(parents=True, exist_ok=True)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = f.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, f)
+        self._load_index()[str(f)] = [time.time(), len(data)]
+        self._evict()
+
+    def memo(self, ns: str, key: str, fn):
+        """Return the cached value for key, computing and storing fn() on a miss."""
+        value = self.get(ns, key, _MISS)
+        if value is _MISS:
+            value = fn()
+            self.put(ns, key, value)
+        return value
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = {}
+            for f in self.root.glob("*/*/*.pkl"):
+                st = f.stat()
+                self._index[str(f)] = [st.st_mtime, st.st_size]
+        return self._index
+
+    def _evict(self):
+        idx = self._load_index()
+        total = sum(size for _, size in idx.values())
+        if total <= self.max_bytes:
+            return
+        for path, (_, size) in sorted(idx.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            del idx[path]
+            total -= size
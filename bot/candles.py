@@ -0,0 +1,185 @@
+# bot/candles.py
+# Local candle store: keeps one base timeframe on disk (e.g. 1h) and derives
+# higher timeframes (4h/1d/1w) from it with UTC-aligned buckets. New base bars
+# only rebuild the higher-timeframe buckets they fall into.
+import pathlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from .exchange import fetch_ohlcv
+
+COLS = ["open", "high", "low", "close", "volume"]
+
+TIMEFRAME_MS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000, "1w": 604_800_000,
+}
+WEEK_OFFSET_MS = 4 * 86_400_000  # weeks start Monday 00:00 UTC (1970-01-05)
+
+def bucket_start(ts_ms, timeframe: str):
+    """UTC-aligned start (ms) of the timeframe bucket containing ts_ms."""
+    step = TIMEFRAME_MS[timeframe]
+    off = WEEK_OFFSET_MS if timeframe == "1w" else 0
+    return (np.asarray(ts_ms, dtype=np.int64) - off) // step * step + off
+
+def _to_ms(index: pd.DatetimeIndex) -> np.ndarray:
+    return ((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+
+def _frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["timestamp"] + COLS)
+    df.index = pd.to_datetime(df.pop("timestamp"), unit="ms", utc=True)
+    df.index.name = "timestamp"
+    return df
+
+def aggregate(base: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """OHLCV bars of timeframe from finer bars (one vectorized groupby)."""
+    if base.empty:
+        return base.copy()
+    keys = bucket_start(_to_ms(base.index), timeframe)
+    g = base.groupby(keys, sort=True)
+    out = pd.DataFrame({"open": g["open"].first(), "high": g["high"].max(),
+                        "low": g["low"].min(), "close": g["close"].last(),
+                        "volume": g["volume"].sum()})
+    out.index = pd.to_datetime(out.index, unit="ms", utc=True)
+    out.index.name = "timestamp"
+    return out
+
+class CandleStore:
+    """
+    bars(client, symbol, timeframe, lookback_days) serves base or derived bars.
+    The base series is synced from the exchange at most once per process per
+    symbol. A derived series is seeded once by a direct fetch for history older
+    than the base coverage; after that it is maintained locally, except for
+    buckets the base no longer covers (a gap), which are fetched directly.
+    """
+
+    def __init__(self, path: str = "state/candles", base: str = "1h", max_days: int = 400,
+                 page_limit: int = 720):
+        self.root = pathlib.Path(path)
+        self.base = base
+        self.max_days = max_days
+        self.page_limit = page_limit  # Kraken returns at most 720 bars per call
+        self._frames = {}    # (symbol, timeframe) -> DataFrame
+        self._changed = {}   # symbol -> earliest base ts (ms) rewritten this process
+        self._synced = set()
+        self._derived = set()  # (symbol, timeframe) already brought up to date
+
+    @classmethod
+    def from_config(cls, cfg: dict):
+        c = (cfg or {}).get("candles")
+        if not c:
+            return None
+        return cls(c.get("path", "state/candles"), c.get("base", "1h"), int(c.get("max_days", 400)))
+
+    # ---------- persistence ----------
+    def _file(self, symbol: str, timeframe: str) -> pathlib.Path:
+        return self.root / f"{symbol.replace('/', '_')}_{timeframe}.csv"
+
+    def _load(self, symbol: str, timeframe: str):
+        key = (symbol, timeframe)
+        if key not in self._frames:
+            f = self._file(symbol, timeframe)
+            df = None
+            if f.exists():
+                raw = pd.read_csv(f)
+                df = _frame(raw[["timestamp"] + COLS].to_numpy().tolist()) if len(raw) else None
+            self._frames[key] = df
+        return self._frames[key]
+
+    def _save(self, symbol: str, timeframe: str, df: pd.DataFrame):
+        self._frames[(symbol, timeframe)] = df
+        self.root.mkdir(parents=True, exist_ok=True)
+        out = df.copy()
+        out.insert(0, "timestamp", _to_ms(df.index))
+        out.to_csv(self._file(symbol, timeframe), index=False)
+
+    def _trim(self, df: pd.DataFrame) -> pd.DataFrame:
+        cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=self.max_days)
+        return df[df.index >= cutoff]
+
+    # ---------- exchange ----------
+    def _fetch(self, client, symbol: str, timeframe: str, since_ms: int) -> pd.DataFrame:
+        step = TIMEFRAME_MS[timeframe]
+        now = int(time.time() * 1000)
+        rows, since = [], since_ms
+        while since < now:
+            batch = fetch_ohlcv(client, symbol, timeframe=timeframe, since=since, limit=self.page_limit)
+            if not batch:
+                break
+            rows.extend(batch)
+            if batch[-1][0] < since or len(batch) < self.page_limit:
+                break
+            since = batch[-1][0] + step
+        df = _frame(rows)
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    def sync(self, client, symbol: str, lookback_days: int):
+        """Append new base bars (re-fetching the last, possibly open, one)."""
+        if symbol in self._synced:
+            return self._load(symbol, self.base)
+        cur = self._load(symbol, self.base)
+        if cur is None or cur.empty:
+            since = int(time.time() * 1000) - lookback_days * 86_400_000
+        else:
+            since = int(_to_ms(cur.index[-1:])[0])
+        new = self._fetch(client, symbol, self.base, since)
+        if not new.empty:
+            # after a long pause the exchange only returns its latest page_limit
+            # bars: keep the base contiguous and let _derive re-seed the hole
+            gap = cur is not None and not cur.empty and \
+                _to_ms(new.index[:1])[0] > _to_ms(cur.index[-1:])[0] + TIMEFRAME_MS[self.base]
+            merged = new if cur is None or gap else pd.concat([cur[cur.index < new.index[0]], new])
+            self._save(symbol, self.base, self._trim(merged))
+            first = int(_to_ms(new.index[:1])[0])
+            self._changed[symbol] = min(self._changed.get(symbol, first), first)
+        self._synced.add(symbol)
+        return self._load(symbol, self.base)
+
+    # ---------- derived timeframes ----------
+    def _derive(self, client, symbol: str, timeframe: str, base: pd.DataFrame, lookback_days: int):
+        cur = self._load(symbol, timeframe)
+        base_ms = _to_ms(base.index)
+        # first bucket fully covered by base bars; older buckets come from the seed
+        first_full = int(bucket_start(base_ms[0], timeframe))
+        if first_full < base_ms[0]:
+            first_full += TIMEFRAME_MS[timeframe]
+        want_from = int(time.time() * 1000) - lookback_days * 86_400_000
+
+        if cur is None or cur.empty:
+            seed = self._fetch(client, symbol, timeframe, want_from) if want_from < first_full else None
+            start = first_full
+            head = seed[_to_ms(seed.index) < first_full] if seed is not None else None
+        else:
+            start = int(bucket_start(min(_to_ms(cur.index[-1:])[0],
+                                         self._changed.get(symbol, np.iinfo(np.int64).max)), timeframe))
+            head = cur[_to_ms(cur.index) < start]
+            if start < first_full:
+                # base bars no longer reach back to start (gap after a long
+                # pause): fetch the uncovered buckets directly, like the seed
+                seed = self._fetch(client, symbol, timeframe, start)
+                head = pd.concat([head, seed[_to_ms(seed.index) < first_full]])
+                start = first_full
+
+        tail = aggregate(base[base_ms >= start], timeframe)
+        out = tail if head is None or head.empty else pd.concat([head, tail])
+        out = self._trim(out)
+        self._save(symbol, timeframe, out)
+        return out
+
+    def bars(self, client, symbol: str, timeframe: str, lookback_days: int = 90) -> pd.DataFrame:
+        if TIMEFRAME_MS[timeframe] % TIMEFRAME_MS[self.base]:
+            raise ValueError(f"{timeframe} is not a multiple of base timeframe {self.base}")
+        base = self.sync(client, symbol, lookback_days)
+        if base is None or base.empty:
+            return _frame([])
+        if timeframe == self.base:
+            df = base
+        elif (symbol, timeframe) in self._derived:
+            df = self._load(symbol, timeframe)
+        else:
+            df = self._derive(client, symbol, timeframe, base, lookback_days)
+            self._derived.add((symbol, timeframe))
+        cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=lookback_days)
+        return df[df.index >= cutoff]
@@ -1,4 +1,4 @@
-import time, pandas as pd
+import time, logging, pandas as pd
 from .exchange import fetch_ohlcv
 
 def ohlcv_df(client, symbol, timeframe="1d", lookback_days=90):
@@ -11,9 +11,20 @@ def ohlcv_df(client, symbol, timeframe="1d", lookback_days=90):
     df.set_index("timestamp", inplace=True)
     return df
 
-def stack_closes(client, symbols, timeframe="1d", lookback_days=90):
+def stack_closes(client, symbols, timeframe="1d", lookback_days=90, store=None):
+    """Close panel; with a candles.CandleStore, timeframes are derived from its local base bars."""
     frames = []
     for s in symbols:
-        df = ohlcv_df(client, s, timeframe=timeframe, lookback_days=lookback_days)
+        if store is not None:
+            df = store.bars(client, s, timeframe=timeframe, lookback_days=lookback_days)
+        else:
+            df = ohlcv_df(client, s, timeframe=timeframe, lookback_days=lookback_days)
         frames.append(df["close"].rename(s))
-    return pd.concat(frames, axis=1).dropna(how="any")
+    panel = pd.concat(frames, axis=1)
+    out = panel.dropna(how="any")
+    if len(out) < len(panel):
+        gaps = panel.isna().sum()
+        logging.getLogger("bot").warning(
+            f"stack_closes: dropped {len(panel) - len(out)} of {len(panel)} bars with missing closes "
+            f"({', '.join(f'{k}={v}' for k, v in gaps[gaps > 0].items())})")
+    return out
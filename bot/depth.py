@@ -0,0 +1,102 @@
+# bot/depth.py
+# Pre-trade depth check: fetch order books for the symbols that will trade in
+# parallel, estimate each order's price impact, and split/cap oversized ones.
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .exchange import order_book
+
+def fetch_order_books(client, symbols, limit=50, max_workers=8):
+    """{symbol: book or None}; one round-trip of latency for all symbols."""
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+
+    def _one(s):
+        try:
+            return order_book(client, s, limit=limit)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+        return dict(zip(symbols, pool.map(_one, symbols)))
+
+def _side_levels(book, side: str):
+    """Levels an order of this side consumes: asks for buys, bids for sells."""
+    levels = (book or {}).get("asks" if side == "buy" else "bids") or []
+    arr = np.array([lvl[:2] for lvl in levels], dtype=float).reshape(-1, 2)
+    return arr[(arr[:, 0] > 0) & (arr[:, 1] > 0)]
+
+def estimate_impact(book, side: str, amount: float):
+    """
+    (vwap, impact in bps vs the best price) for a market order of amount.
+    Impact is inf when the visible book is too thin to fill it.
+    """
+    lv = _side_levels(book, side)
+    if len(lv) == 0 or amount <= 0:
+        return None, (math.inf if amount > 0 else 0.0)
+    px, qty = lv[:, 0], lv[:, 1]
+    cum_q = np.cumsum(qty)
+    if amount > cum_q[-1]:
+        return None, math.inf
+    k = int(np.searchsorted(cum_q, amount))
+    filled_before = cum_q[k - 1] if k > 0 else 0.0
+    cost = float(np.dot(px[:k], qty[:k])) + px[k] * (amount - filled_before)
+    vwap = cost / amount
+    sign = 1.0 if side == "buy" else -1.0
+    return float(vwap), float(sign * (vwap / px[0] - 1.0) * 1e4)
+
+def max_amount_within(book, side: str, budget_bps: float) -> float:
+    """Largest amount whose VWAP stays within budget_bps of the best price."""
+    lv = _side_levels(book, side)
+    if len(lv) == 0:
+        return 0.0
+    px, qty = lv[:, 0], lv[:, 1]
+    sign = 1.0 if side == "buy" else -1.0
+    limit = px[0] * (1.0 + sign * budget_bps / 1e4)
+    cum_q = np.cumsum(qty)
+    cum_c = np.cumsum(px * qty)
+    # VWAP after consuming each whole level; the first one past the limit
+    # holds the crossing (levels priced beyond the limit can still fit partly)
+    over = sign * (cum_c / cum_q - limit) > 0
+    if not over.any():
+        return float(cum_q[-1])  # whole visible book fits the budget
+    k = int(np.argmax(over))
+    a_prev = cum_q[k - 1] if k > 0 else 0.0
+    c_prev = cum_c[k - 1] if k > 0 else 0.0
+    # VWAP(a) = (c_prev + px[k] * (a - a_prev)) / a hits the limit at:
+    return float(min(max((px[k] * a_prev - c_prev) / (px[k] - limit), a_prev), cum_q[k]))
+
+def refreshed_cap(client, symbol: str, side: str, budget_bps: float, fallback: float, limit=50) -> float:
+    """In-budget amount against a freshly fetched book (one call); fallback if that fails."""
+    try:
+        book = order_book(client, symbol, limit=limit)
+    except Exception:
+        return fallback
+    return max_amount_within(book, side, budget_bps) if _side_levels(book, side).size else fallback
+
+def size_with_depth(amount: float, side: str, book, budget_bps: float, mode="cap",
+                    max_slices=4, min_amount=0.0):
+    """
+    Child order amounts for a parent order of amount.
+      - no/empty book, or impact within budget: [amount]
+      - mode "cap"  : one order of the in-budget amount
+      - mode "split": up to max_slices orders of at most the in-budget amount
+    Slices smaller than min_amount (exchange/user minimum) are dropped.
+    """
+    if not book or amount <= 0:
+        return [amount]
+    _, impact = estimate_impact(book, side, amount)
+    if impact <= budget_bps:
+        return [amount]
+    cap = max_amount_within(book, side, budget_bps)
+    if cap < max(min_amount, 1e-12):
+        return []
+    if mode == "split":
+        n = min(int(max_slices), math.ceil(amount / cap))
+        slices = [min(cap, amount - i * cap) for i in range(n)]
+    else:
+        slices = [cap]
+    return [a for a in slices if a >= min_amount]
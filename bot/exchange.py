@@ -1,7 +1,10 @@
+import threading
+from decimal import Decimal, ROUND_DOWN
 import ccxt
 from .utils import env
 
-def make_client(name: str):
+def make_client(name: str, resilience: dict | None = None):
+    """ccxt client; with a resilience config it is wrapped in resilience.ResilientClient."""
     ex_cls = getattr(ccxt, name.lower())
     client = ex_cls({
         "apiKey": env("EXCHANGE_KEY"),
@@ -10,27 +13,53 @@ def make_client(name: str):
         "enableRateLimit": True,
         "options": {"adjustForTimeDifference": True}
     })
+    if resilience is not None:
+        from .resilience import ResilientClient
+        return ResilientClient.from_config(client, resilience)
     return client
 
+# Signed (private) calls carry a nonce that must reach the exchange in
+# increasing order per API key; concurrent ones fail with EAPI:Invalid nonce.
+# Hold this lock across each signed call; public data calls stay parallel.
+_SIGNED = threading.Lock()
+
 def fetch_ohlcv(client, symbol, timeframe="1d", since=None, limit=200):
     return client.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
 
 def balance_of(client, code: str):
-    bal = client.fetch_balance()
+    with _SIGNED:
+        bal = client.fetch_balance()
     return bal.get("total",{}).get(code,0.0), bal.get("free",{}).get(code,0.0), bal.get("used",{}).get(code,0.0)
 
+def balances(client):
+    """Full balance snapshot (one call); see balance_of for a single code."""
+    with _SIGNED:
+        return client.fetch_balance()
+
+def prices(client, symbols):
+    """{symbol: last price} for several symbols in one bulk ticker call."""
+    tickers = client.fetch_tickers(list(symbols))
+    return {s: (tickers.get(s) or {}).get("last") or (tickers.get(s) or {}).get("close") for s in symbols}
+
 def market_buy(client, symbol, amount):
-    return client.create_order(symbol, "market", "buy", amount)
+    with _SIGNED:
+        return client.create_order(symbol, "market", "buy", amount)
 
 def market_sell(client, symbol, amount):
-    return client.create_order(symbol, "market", "sell", amount)
+    with _SIGNED:
+        return client.create_order(symbol, "market", "sell", amount)
 
 def price(client, symbol):
     t = client.fetch_ticker(symbol)
     return t.get("last") or t.get("close")
 
+def order_book(client, symbol, limit=50):
+    return client.fetch_order_book(symbol, limit=limit)
+
 # ---------- Market metadata & constraints ----------
 
+DEFAULT_MIN_COST = 10.0  # Kraken typically around $5–$10; we default to $10
+
 def load_markets(client):
     """Load markets once per run (ccxt caches on the client)."""
     try:
@@ -38,6 +67,24 @@ def load_markets(client):
     except Exception:
         return {}
 
+def prime_markets(client, markets: dict, currencies: dict = None):
+    """
+    Install cached market dicts on the client. ccxt calls load_markets() before
+    every request and only downloads when client.markets is empty, so a primed
+    client never fetches the full markets/currencies list.
+    """
+    client.set_markets(list(markets.values()), currencies or None)
+    opts = getattr(client, "options", None)
+    if isinstance(opts, dict) and "marketsByAltname" in opts:  # kraken builds this in fetch_markets
+        opts["marketsByAltname"] = client.index_by(list(client.markets.values()), "altname")
+
+def markets_subset(client, symbols):
+    """Loaded market and currency dicts for just these symbols (JSON-serializable)."""
+    markets = {s: client.markets[s] for s in symbols if s in (client.markets or {})}
+    codes = {c for m in markets.values() for c in (m.get("base"), m.get("quote")) if c}
+    currencies = {c: v for c, v in (client.currencies or {}).items() if c in codes}
+    return markets, currencies
+
 def market_info(client, symbol: str):
     """Return ccxt market dict for symbol (after load_markets)."""
     load_markets(client)
@@ -46,14 +93,19 @@ def market_info(client, symbol: str):
     except Exception:
         return {}
 
-def min_trade_constraints(client, symbol: str, px: float):
+def min_trade_constraints(client, symbol: str, px: float, records=None):
     """
     Returns a dict with Kraken/ccxt min trade constraints for this symbol:
       - min_cost: minimum notional in quote currency (e.g., USD)
       - min_amount: minimum amount of base asset
       - amount_precision: for rounding order sizes
+    Served from precomputed records (bot.markets) when one exists for symbol.
     Falls back to reasonable defaults if not provided by the exchange.
     """
+    rec = (records or {}).get(symbol)
+    if rec is not None:
+        return _constraints_from_record(rec, px)
+
     m = market_info(client, symbol) or {}
     limits = m.get("limits", {}) or {}
 
@@ -73,7 +125,7 @@ def min_trade_constraints(client, symbol: str, px: float):
 
     # sensible fallbacks if the exchange didn't provide values
     if min_cost is None or min_cost <= 0:
-        min_cost = 10.0  # Kraken typically around $5–$10; we default to $10
+        min_cost = DEFAULT_MIN_COST
     if min_amount is None or min_amount <= 0:
         min_amount = 0.0
 
@@ -88,10 +140,69 @@ def min_trade_constraints(client, symbol: str, px: float):
         "amount_precision": amount_precision
     }
 
-def amount_to_precision(client, symbol: str, amount: float) -> float:
-    """Round amount to the exchange precision for this market."""
+def _constraints_from_record(rec: dict, px: float):
+    min_cost = rec.get("min_cost")
+    min_amount = rec.get("min_amount") or 0.0
+    if not min_cost and min_amount and px:
+        min_cost = float(min_amount) * float(px)
+    if not min_cost or min_cost <= 0:
+        min_cost = DEFAULT_MIN_COST
+    return {
+        "min_cost": float(min_cost),
+        "min_amount": float(min_amount),
+        "amount_precision": rec.get("amount_precision")
+    }
+
+def truncate_to_step(amount: float, step: float) -> float:
+    """
+    Truncate amount to a multiple of step in decimal, like ccxt's TRUNCATE. Exact,
+    so truncating an already-truncated amount is a no-op (float division is not).
+    """
+    if not step or step <= 0:
+        return float(amount)
+    st = Decimal(repr(float(step)))
+    return float((Decimal(repr(float(amount))) / st).to_integral_value(ROUND_DOWN) * st)
+
+def amount_to_precision(client, symbol: str, amount: float, records=None) -> float:
+    """Round amount to the exchange precision for this market (truncates, like ccxt)."""
+    step = ((records or {}).get(symbol) or {}).get("amount_step")
+    if step:
+        return truncate_to_step(amount, step)
     try:
         return float(client.amount_to_precision(symbol, amount))
     except Exception:
         return float(amount)
 
+def _amount_step(precision, mode) -> float:
+    """Order-size increment implied by a ccxt amount precision (0.0 = no rounding)."""
+    if precision is None:
+        return 0.0
+    if mode == ccxt.TICK_SIZE:
+        return float(precision)
+    if mode == ccxt.DECIMAL_PLACES:
+        return 10.0 ** -int(precision)
+    return 0.0  # significant digits has no fixed step
+
+def constraints_snapshot(client, symbols):
+    """
+    Per-symbol limits/precision as plain dicts, for sizing orders offline:
+      - min_cost: exchange min notional, or None (derived from min_amount * px later)
+      - min_amount: minimum amount of base asset (0.0 if none)
+      - amount_step: truncation increment for order sizes (0.0 = no rounding)
+      - amount_precision: raw ccxt precision, as min_trade_constraints reports it
+    """
+    mode = getattr(client, "precisionMode", ccxt.TICK_SIZE)
+    snap = {}
+    for s in symbols:
+        m = market_info(client, s) or {}
+        limits = m.get("limits", {}) or {}
+        min_cost = (limits.get("cost") or {}).get("min")
+        min_amount = (limits.get("amount") or {}).get("min")
+        precision = (m.get("precision") or {}).get("amount")
+        snap[s] = {
+            "min_cost": float(min_cost) if min_cost else None,
+            "min_amount": float(min_amount) if min_amount else 0.0,
+            "amount_step": _amount_step(precision, mode),
+            "amount_precision": precision,
+        }
+    return snap
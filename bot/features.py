@@ -0,0 +1,77 @@
+# bot/features.py
+# Per-run feature store over the closes panel: log returns and rolling/EWM
+# stats are computed once, memoized by (kind, window), and shared by regime,
+# selection and weighting so every stage sees the same numbers.
+import numpy as np
+import pandas as pd
+
+from .rolling import rolling_std_2d
+from .quantum_alloc import _ewma_cov
+
+ANNUALIZE = np.sqrt(365)  # daily bars
+
+class FeatureStore:
+    """
+    Built once from an aligned closes panel (no NaNs, as stack_closes returns).
+    Column-wise features can be sliced by any subset of symbols.
+    window: trailing rows seen by selection and weighting (mean, tail, EWM and
+    covariance stats); rolling_vol and the regimes use the whole panel.
+    None = the whole panel everywhere.
+    """
+
+    def __init__(self, closes: pd.DataFrame, window: int = None):
+        self.closes = closes
+        self.window = window
+        self._memo = {}
+
+    def memo(self, key, fn):
+        if key not in self._memo:
+            self._memo[key] = fn()
+        return self._memo[key]
+
+    def returns(self) -> pd.DataFrame:
+        """Log returns (first row NaN), like np.log(closes).diff()."""
+        return self.memo(("returns",), lambda: np.log(self.closes).diff())
+
+    def returns_array(self) -> np.ndarray:
+        """Log returns without the leading NaN row, like np.diff(np.log(arr), axis=0)."""
+        return self.memo(("returns_array",), lambda: self.returns().to_numpy()[1:])
+
+    def window_returns(self) -> pd.DataFrame:
+        """Returns within the last `window` closes (no leading NaN row)."""
+        def _f():
+            rets = self.returns().iloc[1:]
+            return rets if self.window is None else rets.tail(max(int(self.window) - 1, 0))
+        return self.memo(("window_returns",), _f)
+
+    def mean_return(self) -> pd.Series:
+        return self.memo(("mean",), lambda: self.window_returns().mean())
+
+    def tail_mean(self, window: int) -> pd.Series:
+        """Mean of the last `window` returns (rets.tail(window).mean())."""
+        return self.memo(("tail_mean", window), lambda: self.window_returns().tail(window).mean())
+
+    def tail_vol(self, window: int, annualize=True) -> pd.Series:
+        """Std of the last `window` returns (rets.tail(window).std()), annualized by default."""
+        def _f():
+            sd = self.window_returns().tail(window).std()
+            return sd * ANNUALIZE if annualize else sd
+        return self.memo(("tail_vol", window, annualize), _f)
+
+    def ewm_mean(self, span: int) -> pd.Series:
+        """Last value of the EWM mean of returns (adjust=False)."""
+        return self.memo(("ewm_mean", span),
+                         lambda: self.window_returns().ewm(span=span, adjust=False).mean().iloc[-1])
+
+    def rolling_vol(self, window: int) -> np.ndarray:
+        """Annualized rolling std of returns over full windows, shape (T-1, N)."""
+        return self.memo(("rolling_vol", window),
+                         lambda: rolling_std_2d(self.returns_array(), window) * ANNUALIZE)
+
+    def ewma_cov(self, alpha: float = 0.94) -> pd.DataFrame:
+        """EWMA covariance of demeaned returns (most recent row weight 1)."""
+        def _f():
+            cols = self.closes.columns
+            return pd.DataFrame(_ewma_cov(self.window_returns().to_numpy(), alpha=alpha),
+                                index=cols, columns=cols)
+        return self.memo(("ewma_cov", alpha), _f)
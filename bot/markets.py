@@ -0,0 +1,90 @@
+# bot/markets.py
+# On-disk cache of per-symbol constraint records (limits + precision) and the
+# raw market/currency dicts behind them. A fresh cache is installed on the
+# client, so ccxt's implicit load_markets() never downloads the full list.
+import json
+import time
+import pathlib
+
+from .exchange import make_client, constraints_snapshot, prime_markets, markets_subset
+from .utils import load_config, setup_logging
+
+DEFAULT_PATH = "state/markets.json"
+DEFAULT_TTL_HOURS = 24.0
+
+def _read(path: str):
+    p = pathlib.Path(path)
+    if not p.exists():
+        return None
+    try:
+        return json.loads(p.read_text())
+    except Exception:
+        return None
+
+def _fresh(cached, exchange_id: str, symbols, ttl_hours: float) -> bool:
+    if not cached or cached.get("exchange") != exchange_id:
+        return False
+    if any(s not in (cached.get("records") or {}) or s not in (cached.get("markets") or {})
+           for s in symbols):
+        return False
+    return time.time() - float(cached.get("ts", 0)) < ttl_hours * 3600
+
+def refresh_constraints(client, symbols, path: str = DEFAULT_PATH):
+    """Download markets, keep only the configured symbols and persist their records."""
+    records = constraints_snapshot(client, symbols)
+    markets, currencies = markets_subset(client, symbols)
+    p = pathlib.Path(path); p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps({
+        "exchange": client.id,
+        "ts": int(time.time()),
+        "records": records,
+        "markets": markets,
+        "currencies": currencies,
+    }, indent=2))
+    return records
+
+def _prime(client, cached) -> bool:
+    try:
+        if (cached or {}).get("markets"):
+            prime_markets(client, cached["markets"], cached.get("currencies"))
+            return True
+    except Exception:
+        pass
+    return False
+
+def load_constraints(client, symbols, path: str = DEFAULT_PATH,
+                     ttl_hours: float = DEFAULT_TTL_HOURS, refresh: bool = False):
+    """
+    Constraint records for symbols, from the cache when it is fresh and covers
+    every symbol; otherwise refreshed from the exchange. If the refresh fails,
+    a stale cache is still better than nothing. A cache that is used is also
+    primed into the client (see exchange.prime_markets).
+    """
+    cached = _read(path)
+    if not refresh and _fresh(cached, client.id, symbols, ttl_hours) and _prime(client, cached):
+        return {s: cached["records"][s] for s in symbols}
+    try:
+        if not client.load_markets():
+            raise RuntimeError("empty markets")
+        return refresh_constraints(client, symbols, path)
+    except Exception:
+        _prime(client, cached)
+        return {s: r for s, r in ((cached or {}).get("records") or {}).items() if s in symbols}
+
+def cache_settings(cfg: dict):
+    """(path, ttl_hours) from the optional markets_cache section of config.yml."""
+    mc = cfg.get("markets_cache") or {}
+    return mc.get("path", DEFAULT_PATH), float(mc.get("ttl_hours", DEFAULT_TTL_HOURS))
+
+def main():
+    """Explicit refresh: python -m bot.markets"""
+    log = setup_logging("INFO")
+    cfg = load_config("config.yml")
+    symbols = (cfg.get("trading") or {}).get("symbols") or []
+    client = make_client((cfg.get("exchange") or {}).get("name", "kraken"))
+    path, _ = cache_settings(cfg)
+    records = refresh_constraints(client, symbols, path)
+    log.info(f"Refreshed {len(records)} market records -> {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# bot/notify.py
+# Non-blocking Telegram notifications: messages are queued and held by a
+# background worker until flush() (end of run / exit), a full message's worth or
+# at most DEFAULT_LINGER_S, so a run posts one or a few batched messages.
+import atexit
+import queue
+import random
+import threading
+import time
+
+import requests
+
+from .utils import env
+
+TELEGRAM_API = "https://api.telegram.org"
+MAX_MESSAGE_LEN = 4000  # Telegram hard limit is 4096 chars
+DEFAULT_LINGER_S = 30.0  # max hold, so a long run still reports while it is running
+
+def _chunks(messages, max_len=MAX_MESSAGE_LEN):
+    """Greedily join messages with newlines into chunks of at most max_len chars."""
+    out, cur = [], ""
+    for m in messages:
+        while len(m) > max_len:  # oversized single message: hard split
+            if cur:
+                out.append(cur); cur = ""
+            out.append(m[:max_len]); m = m[max_len:]
+        if cur and len(cur) + 1 + len(m) > max_len:
+            out.append(cur); cur = ""
+        cur = f"{cur}\n{m}" if cur else m
+    if cur:
+        out.append(cur)
+    return out
+
+class TelegramNotifier:
+    """
+    send() only enqueues; a daemon worker holds messages until flush(), until
+    they fill max_len, or until linger seconds after the first held message
+    (linger=None: hold until flush), then posts them joined together.
+    Posts reuse one HTTP session, time out after `timeout` seconds and are
+    retried with jittered exponential backoff. Failures are never raised.
+    """
+
+    def __init__(self, token: str, chat_id: str, base_url: str = TELEGRAM_API,
+                 timeout: float = 5.0, retries: int = 3, backoff: float = 0.5,
+                 linger: float = DEFAULT_LINGER_S, max_len: int = MAX_MESSAGE_LEN):
+        self.token, self.chat_id = token, chat_id
+        self.base_url = base_url.rstrip("/")
+        self.timeout, self.retries, self.backoff = timeout, retries, backoff
+        self.linger, self.max_len = linger, max_len
+        self.sent = 0      # successful HTTP posts
+        self.dropped = 0   # batches given up on after retries
+        self._q = queue.Queue()
+        self._session = requests.Session()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token and self.chat_id)
+
+    def send(self, text: str):
+        if not self.enabled or not text:
+            return
+        self._ensure_worker()
+        self._q.put(text)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block until everything queued so far has been posted (or given up on)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telegram", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        batch, waiters, size, deadline = [], [], 0, None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # linger expired
+            if isinstance(item, str):
+                batch.append(item)
+                size += len(item) + 1
+                if deadline is None and self.linger is not None:
+                    deadline = time.monotonic() + self.linger
+            elif item is not None:
+                waiters.append(item)
+            if item is not None and not waiters and size < self.max_len:
+                continue  # keep holding
+            chunks = _chunks(batch, self.max_len)
+            if item is not None and not waiters:
+                # size limit: post the full chunks, keep holding the remainder
+                batch, chunks = chunks[-1:], chunks[:-1]
+                size = sum(len(m) + 1 for m in batch)
+            else:
+                batch, size, deadline = [], 0, None
+            for chunk in chunks:
+                self._post(chunk)
+            for w in waiters:
+                w.set()
+            waiters = []
+
+    def _post(self, text: str):
+        url = f"{self.base_url}/bot{self.token}/sendMessage"
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            try:
+                r = self._session.post(url, data={"chat_id": self.chat_id, "text": text},
+                                       timeout=self.timeout)
+                if r.status_code == 200:
+                    self.sent += 1
+                    return
+                if r.status_code == 429:  # rate limited: honour retry_after
+                    try:
+                        delay = float(r.json()["parameters"]["retry_after"])
+                    except Exception:
+                        pass
+                elif r.status_code < 500:
+                    break  # bad token/chat: retrying will not help
+            except requests.RequestException:
+                pass
+            if attempt < self.retries:
+                time.sleep(delay)
+        self.dropped += 1
+
+_telegram = None
+
+def telegram() -> TelegramNotifier:
+    """Process-wide notifier from TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID (/ TELEGRAM_LINGER_S)."""
+    global _telegram
+    if _telegram is None:
+        linger = env("TELEGRAM_LINGER_S")  # optional override of the max hold
+        _telegram = TelegramNotifier(env("TELEGRAM_BOT_TOKEN"), env("TELEGRAM_CHAT_ID"),
+                                     linger=float(linger) if linger else DEFAULT_LINGER_S)
+    return _telegram
@@ -0,0 +1,143 @@
+# bot/paper.py
+# Simulated execution: replays trade.main's sizing/skip rules against a
+# constraints snapshot (exchange.constraints_snapshot) with fees and slippage.
+import numpy as np
+import pandas as pd
+
+from .exchange import DEFAULT_MIN_COST, truncate_to_step
+
+# Per-symbol order status codes returned by plan_orders / execute_orders
+FILLED, SKIP_NO_PRICE, SKIP_MIN_NOTIONAL, SKIP_PRECISION, REJECT_FUNDS = 0, 1, 2, 3, 4
+
+STATUS_TEXT = {
+    FILLED: "filled",
+    SKIP_NO_PRICE: "no price",
+    SKIP_MIN_NOTIONAL: "notional below min",
+    SKIP_PRECISION: "rounded amount too small",
+    REJECT_FUNDS: "insufficient funds",
+}
+
+def constraint_arrays(snapshot: dict, symbols):
+    """Turn a constraints snapshot into aligned arrays (min_cost may be NaN)."""
+    rows = [snapshot.get(s) or {} for s in symbols]
+    min_cost = np.array([r.get("min_cost") or np.nan for r in rows], dtype=float)
+    min_amount = np.array([r.get("min_amount") or 0.0 for r in rows], dtype=float)
+    step = np.array([r.get("amount_step") or 0.0 for r in rows], dtype=float)
+    return min_cost, min_amount, step
+
+_truncate_each = np.frompyfunc(truncate_to_step, 2, 1)
+
+def _truncate(amount, step):
+    # same exact decimal truncation as exchange.amount_to_precision
+    return _truncate_each(amount, step).astype(float)
+
+def plan_orders(equity, weights, holdings, prices, cons, min_notional=10.0):
+    """
+    Vectorized version of the live order loop in trade.main.
+    All inputs are arrays over symbols; cons = constraint_arrays(...).
+    Returns (signed order amounts, status codes, min notional used).
+    """
+    min_cost, min_amount, step = cons
+    prices = np.nan_to_num(np.asarray(prices, dtype=float), nan=0.0)
+    has_px = prices > 0
+    safe_px = np.where(has_px, prices, 1.0)
+
+    targets = np.where(has_px, equity * np.asarray(weights, dtype=float) / safe_px, 0.0)
+    diff = targets - holdings
+    notional = np.abs(diff) * prices
+
+    # min_trade_constraints: derive min_cost from min_amount * px, then fall back
+    derived = np.where((np.isnan(min_cost) | (min_cost == 0)) & (min_amount > 0),
+                       min_amount * prices, min_cost)
+    derived = np.where(np.isnan(derived) | (derived <= 0), DEFAULT_MIN_COST, derived)
+    min_not = np.maximum(min_notional, derived)
+
+    amt = np.abs(diff)
+    amt = np.where((min_amount > 0) & (amt < min_amount), min_amount, amt)
+    amt = _truncate(amt, step)
+
+    status = np.full(len(prices), FILLED)
+    status[amt <= 0] = SKIP_PRECISION
+    status[notional < min_not] = SKIP_MIN_NOTIONAL
+    status[~has_px] = SKIP_NO_PRICE
+    orders = np.where(status == FILLED, np.sign(diff) * amt, 0.0)
+    return orders, status, min_not
+
+def execute_orders(orders, status, prices, cash, holdings, fee_rate=0.0026, slippage_bps=5.0):
+    """
+    Fill planned orders at prices +/- slippage, charging fee_rate on notional.
+    Sells never exceed holdings and buys are funded in symbol order from cash
+    plus sell proceeds; unfunded buys are marked REJECT_FUNDS.
+    Returns (cash, holdings, status, fees paid).
+    """
+    prices = np.nan_to_num(np.asarray(prices, dtype=float), nan=0.0)
+    slip = slippage_bps / 1e4
+    status = status.copy()
+
+    sells = np.minimum(np.where(orders < 0, -orders, 0.0), np.maximum(holdings, 0.0))
+    sell_px = prices * (1.0 - slip)
+    proceeds = sells * sell_px
+    cash = cash + proceeds.sum() * (1.0 - fee_rate)
+
+    buys = np.where(orders > 0, orders, 0.0)
+    cost = buys * prices * (1.0 + slip) * (1.0 + fee_rate)
+    # fund in symbol order like the live loop: a rejected buy spends nothing,
+    # so later, smaller buys can still fill
+    rejected = np.zeros(len(cost), dtype=bool)
+    left = cash + 1e-9
+    for i in np.flatnonzero(buys > 0):
+        if cost[i] <= left:
+            left -= cost[i]
+        else:
+            rejected[i] = True
+    buys = np.where(rejected, 0.0, buys)
+    cost = np.where(rejected, 0.0, cost)
+    status[rejected] = REJECT_FUNDS
+
+    cash = cash - cost.sum()
+    holdings = holdings - sells + buys
+    fees = proceeds.sum() * fee_rate + (cost * fee_rate / (1.0 + fee_rate)).sum()
+    return float(cash), holdings, status, float(fees)
+
+def rebalance(weights, prices, cash, holdings, cons, fee_rate=0.0026,
+              slippage_bps=5.0, min_notional=10.0):
+    """Plan + execute one rebalance; equity is marked at prices like the live path."""
+    px = np.nan_to_num(np.asarray(prices, dtype=float), nan=0.0)
+    equity = cash + float(np.dot(holdings, px))
+    orders, status, _ = plan_orders(equity, weights, holdings, px, cons, min_notional)
+    return execute_orders(orders, status, px, cash, holdings, fee_rate, slippage_bps)
+
+def simulate(closes: pd.DataFrame, target_weights: pd.DataFrame, snapshot: dict,
+             initial_equity=1000.0, fee_rate=0.0026, slippage_bps=5.0, min_notional=10.0):
+    """
+    Backtest driver. target_weights is indexed by rebalance dates (subset of
+    closes.index) with one column per symbol. Orders are sized and filled at
+    the rebalance close; equity between rebalances is marked to market as one
+    matrix product per holding period.
+    Returns (equity Series, DataFrame of fees/turnover per rebalance).
+    """
+    symbols = list(closes.columns)
+    px = closes.to_numpy(dtype=float)
+    cons = constraint_arrays(snapshot, symbols)
+    tw = target_weights.sort_index().reindex(columns=symbols).fillna(0.0)
+    reb_idx = closes.index.get_indexer(tw.index)
+    if (reb_idx < 0).any():
+        raise ValueError("target_weights index must be a subset of closes.index")
+
+    equity = np.full(len(closes), float(initial_equity))
+    cash, holdings = float(initial_equity), np.zeros(len(symbols))
+    fills = []
+    bounds = list(reb_idx) + [len(closes)]
+    for k, i in enumerate(reb_idx):
+        before = holdings
+        cash, holdings, status, fees = rebalance(
+            tw.iloc[k].to_numpy(), px[i], cash, holdings, cons,
+            fee_rate=fee_rate, slippage_bps=slippage_bps, min_notional=min_notional)
+        block = np.nan_to_num(px[i:bounds[k + 1]], nan=0.0)
+        equity[i:bounds[k + 1]] = cash + block @ holdings
+        traded = np.abs(holdings - before) @ np.nan_to_num(px[i], nan=0.0)
+        fills.append({"date": closes.index[i], "fees": fees, "traded": float(traded),
+                      "skipped": int((status != FILLED).sum())})
+
+    curve = pd.Series(equity, index=closes.index, name="equity")
+    return curve, pd.DataFrame(fills).set_index("date") if fills else pd.DataFrame()
@@ -1,11 +1,12 @@
 # bot/quantum_alloc.py
+import hashlib
 import numpy as np
 import pandas as pd
 
 # Try quantum deps; fallback if missing
 try:
     import dimod
-    from dwave_neal.sampler import SimulatedAnnealingSampler
+    from neal import SimulatedAnnealingSampler  # dwave-neal installs as `neal`
     _HAS_QUANTUM = True
 except Exception:
     _HAS_QUANTUM = False
@@ -16,16 +17,17 @@ def _ewma_cov(returns: np.ndarray, alpha=0.94):
     T, N = returns.shape
     mu = returns.mean(axis=0, keepdims=True)
     X = returns - mu
-    cov = np.zeros((N, N))
-    denom = 0.0
-    for t in range(T - 1, -1, -1):
-        w = alpha ** (T - 1 - t)
-        cov += w * np.outer(X[t], X[t])
-        denom += w
-    cov /= max(denom, 1e-9)
+    w = alpha ** np.arange(T - 1, -1, -1, dtype=float)  # most recent row weighs 1
+    cov = (X * w[:, None]).T @ X
+    cov /= max(w.sum(), 1e-9)
     return cov
 
-def mean_variance_params(closes: pd.DataFrame):
+def mean_variance_params(closes: pd.DataFrame, features=None):
+    if features is not None:
+        cols = list(closes.columns)
+        mu = features.mean_return()[cols].to_numpy()
+        Sigma = features.ewma_cov(alpha=0.94).loc[cols, cols].to_numpy()
+        return mu, Sigma
     arr = closes.values
     rets = np.diff(np.log(arr), axis=0)
     mu = rets.mean(axis=0)
@@ -48,31 +50,75 @@ def qubo_from_mean_variance(mu, Sigma, lam=0.5, k=3, penalty=2.0):
         Q[(i, i)] += penalty * ((-2 * k) + 1)
     return Q
 
-def _solve_qubo(Q, num_reads=600):
-    sampler = SimulatedAnnealingSampler()
-    ss = sampler.sample_qubo(Q, num_reads=num_reads)
+def _quantize(a: np.ndarray, rel: float) -> np.ndarray:
+    """
+    Round a to a grid of rel x its largest magnitude. The scale is rounded up
+    to a power of two so the grid only moves when the magnitude doubles/halves.
+    """
+    scale = float(np.abs(a).max()) if np.size(a) else 0.0
+    if not rel or not scale > 0:
+        return a
+    step = rel * 2.0 ** np.ceil(np.log2(scale))
+    return np.round(a / step) * step
+
+def _qubo_key(Q, num_reads, seed) -> str:
+    items = sorted(Q.items())
+    h = hashlib.sha1(repr((num_reads, seed)).encode())
+    h.update(np.array([k for k, _ in items], dtype=np.int64).tobytes())
+    h.update(np.array([v for _, v in items], dtype=float).tobytes())
+    return h.hexdigest()
+
+def _solve_qubo(Q, num_reads=600, seed=None, initial_state=None, cache=None):
+    """
+    Lowest-energy sample of Q. With a seed the result is reproducible; with a
+    bot.cache.ResultCache it is also stored on disk keyed by the coefficients,
+    so a later run on the same problem skips the sampler.
+    initial_state (0/1 vector) warm-starts one read.
+    """
+    if cache is not None:
+        key = _qubo_key(Q, num_reads, seed)
+        return cache.memo("qubo", key, lambda: _solve_qubo(Q, num_reads, seed, initial_state)).copy()
+
+    n = 1 + max(max(k) for k in Q)
+    kwargs = {"num_reads": num_reads}
+    if seed is not None:
+        kwargs["seed"] = int(seed)
+    if initial_state is not None and len(initial_state) == n:
+        kwargs["initial_states"] = (np.atleast_2d(np.asarray(initial_state, dtype=np.int8)), list(range(n)))
+        kwargs["initial_states_generator"] = "random"  # remaining reads start at random
+    ss = SimulatedAnnealingSampler().sample_qubo(Q, **kwargs)
     x = ss.first.sample
     return np.array([x[i] for i in range(len(x))], dtype=int)
 
 # ---------- Expected-return selector ----------
 
-def _expected_return_scores(closes: pd.DataFrame, estimator="ema", window=30, penalize_vol=0.0):
+def _expected_return_scores(closes: pd.DataFrame, estimator="ema", window=30, penalize_vol=0.0,
+                            features=None):
     """
     Returns a np.array score per column, higher = better.
     - estimator: "ema" or "sma"
     - window: lookback in days
     - penalize_vol: subtract penalize_vol * vol (annualized) from the return estimate
+    - features: optional features.FeatureStore over the same (aligned) panel
     """
-    px = closes.dropna()
-    rets = np.log(px).diff()
+    cols = list(closes.columns)
+    if features is not None:
+        ewm = lambda: features.ewm_mean(window)[cols]
+        sma = lambda: features.tail_mean(window)[cols]
+        tail_vol = lambda: features.tail_vol(window)[cols]
+    else:
+        rets = np.log(closes.dropna()).diff()
+        ewm = lambda: rets.ewm(span=window, adjust=False).mean().iloc[-1]
+        sma = lambda: rets.tail(window).mean()
+        tail_vol = lambda: rets.tail(window).std() * np.sqrt(365)
 
     if estimator.lower() == "ema":
-        mu = rets.ewm(span=window, adjust=False).mean().iloc[-1]
+        mu = ewm()
     else:  # sma
-        mu = rets.tail(window).mean()
+        mu = sma()
 
     if penalize_vol and penalize_vol > 0:
-        vol = rets.tail(window).std() * np.sqrt(365)
+        vol = tail_vol()
         score = mu - penalize_vol * vol
     else:
         score = mu
@@ -86,12 +132,21 @@ def _expected_return_scores(closes: pd.DataFrame, estimator="ema", window=30, pe
 def select_assets(closes: pd.DataFrame,
                   max_positions: int = 3,
                   lam: float = 0.5,
-                  selection_cfg: dict | None = None):
+                  selection_cfg: dict | None = None,
+                  warm_start: list | None = None,
+                  features=None,
+                  cache=None):
     """
     Select a list of symbols.
     Modes:
       - expected_return: rank by estimated return (optionally penalize volatility)
       - risk_adjusted  : mean-variance via QUBO or greedy fallback (uses lam)
+        QUBO knobs in selection_cfg: seed (default 0; null = unseeded),
+        num_reads (600), quantize (0.05: mu/Sigma grid relative to their scale,
+        so a new bar that barely moves them reuses the cached solution).
+        warm_start = previously chosen symbols.
+    features: optional features.FeatureStore over the full (aligned) panel.
+    cache: optional bot.cache.ResultCache; QUBO solutions persist there.
     """
     selection_cfg = selection_cfg or {}
     mode = (selection_cfg.get("mode") or "risk_adjusted").lower()
@@ -100,17 +155,27 @@ def select_assets(closes: pd.DataFrame,
         est = selection_cfg.get("estimator", "ema")
         window = int(selection_cfg.get("window", 30))
         penalize_vol = float(selection_cfg.get("penalize_vol", 0.0))
-        scores = _expected_return_scores(closes, estimator=est, window=window, penalize_vol=penalize_vol)
+        scores = _expected_return_scores(closes, estimator=est, window=window, penalize_vol=penalize_vol,
+                                         features=features)
         idx = np.argsort(scores)[::-1][:max(1, max_positions)]
         return list(closes.columns[idx])
 
     # risk_adjusted path
-    mu, Sigma = mean_variance_params(closes)
+    mu, Sigma = mean_variance_params(closes, features=features)
 
     if _HAS_QUANTUM:
         try:
-            Q = qubo_from_mean_variance(mu, Sigma, lam=lam, k=max_positions, penalty=2.0)
-            x = _solve_qubo(Q)
+            rel = float(selection_cfg.get("quantize", 0.05))
+            Q = qubo_from_mean_variance(_quantize(mu, rel), _quantize(Sigma, rel),
+                                        lam=lam, k=max_positions, penalty=2.0)
+            x0 = None
+            if warm_start:
+                x0 = np.array([1 if c in warm_start else 0 for c in closes.columns])
+            x = _solve_qubo(Q,
+                            num_reads=int(selection_cfg.get("num_reads", 600)),
+                            seed=selection_cfg.get("seed", 0),
+                            initial_state=x0,
+                            cache=cache)
             if x.sum() == 0:
                 x[np.argmax(mu)] = 1
             idx = np.where(x == 1)[0]
@@ -2,6 +2,8 @@
 import numpy as np
 import pandas as pd
 
+from .rolling import rolling_mean_2d, rolling_std_2d
+
 def realized_vol(series: pd.Series, window=20):
     rets = np.log(series).diff()
     vol = rets.rolling(window).std() * np.sqrt(365)  # annualized approx (daily data)
@@ -13,7 +15,55 @@ def ma_slope(series: pd.Series, window=100):
     slope = (ma - ma.shift(10)) / 10.0
     return slope
 
-def market_regime(closes: pd.DataFrame, benchmark: str = "BTC/USD") -> str:
+REGIME_MIN_BARS = 120  # fewer closes than this always classify as "chop"
+
+def asset_regimes(closes: pd.DataFrame, ma_window=100, slope_lag=10, vol_window=20,
+                  features=None) -> pd.DataFrame:
+    """
+    Regime per column of the closes panel in one vectorized pass.
+    Same rules as market_regime, applied to every asset at once.
+    Returns a DataFrame indexed by symbol with slope, vol, vol_pct and regime.
+    With a features.FeatureStore over the same panel, returns/vol come from it
+    and the result is memoized there.
+    """
+    if features is not None:
+        return features.memo(("regimes", ma_window, slope_lag, vol_window),
+                             lambda: _asset_regimes(closes, ma_window, slope_lag, vol_window, features))
+    return _asset_regimes(closes, ma_window, slope_lag, vol_window, None)
+
+def _asset_regimes(closes, ma_window, slope_lag, vol_window, features):
+    px = closes.to_numpy(dtype=float)
+    n_obs = (~np.isnan(px)).sum(axis=0)
+    T = px.shape[0]
+
+    ma = rolling_mean_2d(px, ma_window)
+    slope = (ma[-1] - ma[-1 - slope_lag]) / float(slope_lag) if T > slope_lag else np.full(px.shape[1], np.nan)
+
+    if features is not None:
+        vol = features.rolling_vol(vol_window)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = np.diff(np.log(px), axis=0)
+        vol = rolling_std_2d(rets, vol_window) * np.sqrt(365)
+    vol_ok = ~np.isnan(vol)
+    vol_last = vol[-1] if len(vol) else np.full(px.shape[1], np.nan)
+    n_vol = vol_ok.sum(axis=0)
+    vol_pct = np.where(n_vol > 0, ((vol <= vol_last) & vol_ok).sum(axis=0) / np.maximum(n_vol, 1), np.nan)
+
+    high_vol = vol_pct > 0.7
+    low_vol = vol_pct < 0.35
+    regime = np.where((slope > 0) & (low_vol | ~high_vol), "bull",
+                      np.where((slope < 0) & high_vol, "bear", "chop"))
+    regime = np.where((n_obs < REGIME_MIN_BARS) | (n_vol < 60) | np.isnan(slope), "chop", regime)
+
+    return pd.DataFrame({"slope": slope, "vol": vol_last, "vol_pct": vol_pct, "regime": regime},
+                        index=closes.columns)
+
+def asset_scales(regimes: pd.DataFrame, scales: dict) -> dict:
+    """Per-asset weight multipliers from their regime (missing regimes -> 1.0)."""
+    return {s: float(scales.get(r, 1.0)) for s, r in regimes["regime"].items()}
+
+def market_regime(closes: pd.DataFrame, benchmark: str = "BTC/USD", features=None) -> str:
     """
     Very simple regime classifier:
     - bull: positive MA slope & low/mid vol
@@ -24,27 +74,6 @@ def market_regime(closes: pd.DataFrame, benchmark: str = "BTC/USD") -> str:
         # fallback: use the first column
         benchmark = closes.columns[0]
 
-    px = closes[benchmark].dropna()
-    if len(px) < 120:
-        return "chop"
-
-    slope = ma_slope(px, window=100).iloc[-1]
-    vol20 = realized_vol(px, window=20).iloc[-1]
-
-    # compare vol to its 1y percentile
-    vol_hist = realized_vol(px, window=20).dropna()
-    if len(vol_hist) < 60:
-        return "chop"
-    vol_pct = (vol_hist <= vol20).mean()  # percentile rank in [0,1]
-
-    # thresholds (tunable)
-    pos_slope = slope > 0
-    neg_slope = slope < 0
-    high_vol = vol_pct > 0.7
-    low_vol  = vol_pct < 0.35
-
-    if pos_slope and (low_vol or not high_vol):
-        return "bull"
-    if neg_slope and high_vol:
-        return "bear"
-    return "chop"
+    if features is not None:
+        return str(asset_regimes(closes, features=features)["regime"].loc[benchmark])
+    return str(asset_regimes(closes[[benchmark]].dropna())["regime"].iloc[0])
@@ -0,0 +1,182 @@
+# bot/resilience.py
+# Resilient wrapper around a ccxt client: per-call-type timeouts, jittered
+# retries for idempotent reads, a circuit breaker, an overall run latency
+# budget, and per-endpoint latency histograms.
+import random
+import threading
+import time
+
+import ccxt
+
+# per-call timeouts in ms (ccxt client.timeout applies per HTTP request)
+DEFAULT_TIMEOUTS_MS = {
+    "load_markets": 20000,
+    "fetch_ohlcv": 10000,
+    "fetch_balance": 8000,
+    "fetch_ticker": 5000,
+    "fetch_tickers": 8000,
+    "fetch_order_book": 5000,
+    "create_order": 15000,
+}
+IDEMPOTENT = {"load_markets", "fetch_ohlcv", "fetch_balance", "fetch_ticker",
+              "fetch_tickers", "fetch_order_book"}
+# retry only transport-level failures; ExchangeError (bad symbol, funds...) is final
+RETRYABLE = (ccxt.NetworkError,)
+
+LATENCY_BUCKETS_MS = [50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+_PER_THREAD = {}  # ccxt class -> subclass with a per-thread `timeout`
+
+def _per_thread_timeout(client):
+    """
+    ccxt reads self.timeout inside each request and has no per-call timeout, so
+    concurrent calls (depth pool, scheduler, venue pool) would overwrite each
+    other's. Swap in a subclass whose timeout lives in a threading.local.
+    """
+    cls = type(client)
+    sub = _PER_THREAD.get(cls)
+    if sub is None:
+        def _get(self):
+            return getattr(self.__dict__["_timeout_local"], "value", self.__dict__["_timeout_default"])
+
+        def _set(self, value):
+            self.__dict__["_timeout_local"].value = value
+
+        sub = _PER_THREAD[cls] = type(cls.__name__, (cls,), {"timeout": property(_get, _set)})
+    default = client.__dict__.pop("timeout", getattr(client, "timeout", 10000))
+    client.__dict__["_timeout_default"] = default
+    client.__dict__["_timeout_local"] = threading.local()
+    # Retype in place rather than building one client per worker thread: a new
+    # client would re-run load_markets, start its own nonce/rate-limit state and
+    # lose the primed markets. The subclass only adds the timeout property, so
+    # isinstance checks and every other attribute behave as before.
+    client.__class__ = sub
+    return default
+
+class CircuitOpenError(ccxt.ExchangeNotAvailable):
+    """Raised without calling the exchange while the breaker is open."""
+
+class BudgetExceededError(ccxt.RequestTimeout):
+    """Raised when the run's latency budget is spent."""
+
+class ResilientClient:
+    """
+    Proxies a ccxt client. Wrapped endpoints (DEFAULT_TIMEOUTS_MS keys) get
+    their own timeout; reads are retried with jittered exponential backoff
+    within the remaining budget; create_order is never retried. After
+    breaker_threshold consecutive failures the breaker opens for
+    breaker_cooldown_s and calls fail fast. Everything else is delegated.
+    """
+
+    def __init__(self, client, timeouts_ms=None, retries=3, backoff_s=0.5, max_backoff_s=8.0,
+                 breaker_threshold=5, breaker_cooldown_s=60.0, budget_s=None):
+        self._client = client
+        self._base_timeout = _per_thread_timeout(client)
+        self._timeouts = {**DEFAULT_TIMEOUTS_MS, **(timeouts_ms or {})}
+        self._retries, self._backoff, self._max_backoff = retries, backoff_s, max_backoff_s
+        self._threshold, self._cooldown = breaker_threshold, breaker_cooldown_s
+        self._deadline = time.monotonic() + budget_s if budget_s else None
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+        self.latency = {}  # endpoint -> {"buckets": [...], "count", "errors", "total_ms"}
+
+    @classmethod
+    def from_config(cls, client, cfg: dict):
+        r = cfg or {}
+        return cls(client, timeouts_ms=r.get("timeouts_ms"), retries=int(r.get("retries", 3)),
+                   backoff_s=float(r.get("backoff_s", 0.5)),
+                   max_backoff_s=float(r.get("max_backoff_s", 8.0)),
+                   breaker_threshold=int(r.get("breaker_threshold", 5)),
+                   breaker_cooldown_s=float(r.get("breaker_cooldown_s", 60.0)),
+                   budget_s=r.get("budget_s"))
+
+    # ---------- budget ----------
+    def remaining(self) -> float:
+        return float("inf") if self._deadline is None else self._deadline - time.monotonic()
+
+    def budget_exceeded(self) -> bool:
+        return self.remaining() <= 0
+
+    # ---------- breaker ----------
+    def _check_breaker(self, name):
+        with self._lock:
+            if time.monotonic() < self._open_until:
+                raise CircuitOpenError(f"circuit open: {name} not attempted")
+
+    def _record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self._threshold:
+                self._open_until = time.monotonic() + self._cooldown
+
+    # ---------- latency ----------
+    def _observe(self, name, ms: float, ok: bool):
+        with self._lock:
+            h = self.latency.setdefault(name, {"buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                                               "count": 0, "errors": 0, "total_ms": 0.0})
+            i = next((k for k, b in enumerate(LATENCY_BUCKETS_MS) if ms <= b), len(LATENCY_BUCKETS_MS))
+            h["buckets"][i] += 1
+            h["count"] += 1
+            h["total_ms"] += ms
+            h["errors"] += 0 if ok else 1
+
+    # ---------- calls ----------
+    def _call(self, name, *args, **kwargs):
+        fn = getattr(self._client, name)
+        attempts = 1 + (self._retries if name in IDEMPOTENT else 0)
+        for attempt in range(attempts):
+            if self.budget_exceeded():
+                raise BudgetExceededError(f"latency budget spent before {name}")
+            self._check_breaker(name)
+            timeout = self._timeouts.get(name, self._base_timeout)
+            # per-thread (see _per_thread_timeout): safe under concurrent calls
+            self._client.timeout = int(min(timeout, max(1.0, self.remaining() * 1000)))
+            t0 = time.monotonic()
+            try:
+                out = fn(*args, **kwargs)
+            except RETRYABLE as e:
+                self._observe(name, (time.monotonic() - t0) * 1000, False)
+                self._record(False)
+                if attempt + 1 >= attempts:
+                    raise
+                delay = min(self._max_backoff, self._backoff * 2 ** attempt) * (0.5 + random.random())
+                if delay >= self.remaining():
+                    raise
+                time.sleep(delay)
+                continue
+            except Exception:
+                self._observe(name, (time.monotonic() - t0) * 1000, False)
+                raise  # exchange said no: not a health signal for the breaker
+            self._observe(name, (time.monotonic() - t0) * 1000, True)
+            self._record(True)
+            return out
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in self._timeouts and callable(attr):
+            return lambda *a, **kw: self._call(name, *a, **kw)
+        return attr
+
+def merge_latency(history: dict, latency: dict) -> dict:
+    """Accumulate one run's histograms into persisted ones (e.g. state["latency"])."""
+    out = dict(history or {})
+    for name, h in latency.items():
+        cur = out.get(name)
+        if not cur or len(cur.get("buckets", [])) != len(h["buckets"]):
+            out[name] = {k: (list(v) if isinstance(v, list) else v) for k, v in h.items()}
+            continue
+        cur["buckets"] = [a + b for a, b in zip(cur["buckets"], h["buckets"])]
+        for k in ("count", "errors", "total_ms"):
+            cur[k] = cur.get(k, 0) + h[k]
+    return out
+
+def format_latency(latency: dict) -> str:
+    parts = []
+    for name, h in sorted(latency.items()):
+        avg = h["total_ms"] / h["count"] if h["count"] else 0.0
+        parts.append(f"{name} n={h['count']} err={h['errors']} avg={avg:.0f}ms")
+    return "; ".join(parts)
@@ -0,0 +1,170 @@
+# bot/risk.py
+# Risk analytics for an equity curve (state equity_history or a backtest):
+# Sharpe, Sortino, historical VaR/CVaR, drawdowns and turnover. Everything is
+# vectorized NumPy; rolling stats use O(n) cumulative sums.
+import numpy as np
+import pandas as pd
+
+from .rolling import rolling_mean_2d, rolling_std_2d
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+def equity_series(history) -> pd.Series:
+    """[[ts, equity], ...] -> Series indexed by UTC time; drops non-positive points (failed reads)."""
+    if not history:
+        return pd.Series(dtype=float, name="equity")
+    arr = np.asarray(history, dtype=float).reshape(-1, 2)
+    arr = arr[np.argsort(arr[:, 0], kind="stable")]
+    arr = arr[arr[:, 1] > 0]
+    idx = pd.to_datetime(arr[:, 0], unit="s", utc=True)
+    return pd.Series(arr[:, 1], index=idx, name="equity")
+
+def resample_equity(equity: pd.Series, freq: str = "1D") -> pd.Series:
+    """
+    Last equity per freq bucket. Live history mixes pre/post-trade points seconds
+    apart with daily ones; stats need one fixed period (None keeps the raw points).
+    """
+    if freq is None or len(equity) < 2:
+        return equity
+    return equity.resample(freq).last().dropna()
+
+def _seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    # unit-agnostic (index resolution may be s/ms/us/ns)
+    return ((index - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).to_numpy(dtype=float)
+
+def periods_per_year(index: pd.DatetimeIndex) -> float:
+    """Annualization factor from the median spacing of the index."""
+    if len(index) < 2:
+        return 365.0
+    dt = np.diff(_seconds(index))
+    step = float(np.median(dt[dt > 0])) if (dt > 0).any() else 86400.0
+    return SECONDS_PER_YEAR / step
+
+def log_returns(equity: pd.Series) -> np.ndarray:
+    return np.diff(np.log(equity.to_numpy(dtype=float)))
+
+def sharpe(r: np.ndarray, ppy: float) -> float:
+    sd = r.std(ddof=1) if len(r) > 1 else 0.0
+    return float(r.mean() / sd * np.sqrt(ppy)) if sd > 0 else float("nan")
+
+def sortino(r: np.ndarray, ppy: float) -> float:
+    if len(r) < 2:
+        return float("nan")
+    dd = np.sqrt(np.mean(np.minimum(r, 0.0) ** 2))
+    return float(r.mean() / dd * np.sqrt(ppy)) if dd > 0 else float("nan")
+
+def rolling_sharpe(r: np.ndarray, window: int, ppy: float) -> np.ndarray:
+    col = r.reshape(-1, 1)
+    mu = rolling_mean_2d(col, window)[:, 0]
+    sd = rolling_std_2d(col, window)[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(sd > 0, mu / sd * np.sqrt(ppy), np.nan)
+
+def rolling_sortino(r: np.ndarray, window: int, ppy: float) -> np.ndarray:
+    col = r.reshape(-1, 1)
+    mu = rolling_mean_2d(col, window)[:, 0]
+    down = np.sqrt(rolling_mean_2d(np.minimum(col, 0.0) ** 2, window)[:, 0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(down > 0, mu / down * np.sqrt(ppy), np.nan)
+
+def var_cvar(r: np.ndarray, alpha: float = 0.95):
+    """Historical one-period VaR/CVaR as positive loss fractions (O(n) via partition)."""
+    if len(r) == 0:
+        return float("nan"), float("nan")
+    simple = np.expm1(r)
+    k = int(np.floor((1.0 - alpha) * len(simple)))
+    part = np.partition(simple, k)
+    var = -part[k]
+    tail = part[:k + 1]
+    return float(var), float(-tail.mean())
+
+def drawdowns(equity: pd.Series) -> dict:
+    """Max depth, and the longest/current underwater spells in bars and days."""
+    eq = equity.to_numpy(dtype=float)
+    if len(eq) == 0:
+        return {"max_drawdown": float("nan"), "max_dd_bars": 0, "max_dd_days": 0.0,
+                "current_drawdown": float("nan"), "current_dd_days": 0.0}
+    peak = np.maximum.accumulate(eq)
+    dd = eq / peak - 1.0
+    under = dd < 0
+    # run-length of underwater spells: spell id increments at each new peak
+    spell = np.cumsum(~under)
+    t = _seconds(equity.index)
+    longest_bars, longest_days = 0, 0.0
+    if under.any():
+        ids = spell[under]
+        starts = np.r_[0, np.flatnonzero(np.diff(ids)) + 1]
+        ends = np.r_[starts[1:], len(ids)] - 1
+        bars = ends - starts + 1
+        # duration from the last peak before the spell to its last underwater point
+        t_under = t[under]
+        peak_pos = np.flatnonzero(~under)
+        first_idx = np.flatnonzero(under)[starts]
+        before = peak_pos[np.searchsorted(peak_pos, first_idx) - 1]
+        days = (t_under[ends] - t[before]) / 86400.0
+        j = int(np.argmax(days))
+        longest_bars, longest_days = int(bars[j]), float(days[j])
+    cur_days = 0.0
+    if under[-1]:
+        last_peak = np.flatnonzero(~under)[-1]
+        cur_days = float((t[-1] - t[last_peak]) / 86400.0)
+    return {"max_drawdown": float(dd.min()), "max_dd_bars": longest_bars, "max_dd_days": longest_days,
+            "current_drawdown": float(dd[-1]), "current_dd_days": cur_days}
+
+def turnover(traded, equity: pd.Series, ppy: float) -> float:
+    """Annualized turnover: traded notional (Series by date) over average equity."""
+    if traded is None or len(traded) == 0 or len(equity) < 2:
+        return float("nan")
+    span_periods = len(equity) - 1
+    return float(np.sum(traded) / equity.mean() * ppy / span_periods)
+
+def risk_report(equity: pd.Series, window: int = 30, alpha: float = 0.95, traded=None,
+                freq: str = "1D") -> dict:
+    """Full-period and trailing-window risk stats for an equity curve (resampled to freq)."""
+    equity = resample_equity(equity, freq)
+    ppy = periods_per_year(equity.index)
+    r = log_returns(equity)
+    rep = {"points": int(len(equity)), "periods_per_year": ppy,
+           "total_return": float(equity.iloc[-1] / equity.iloc[0] - 1.0) if len(equity) > 1 else float("nan"),
+           "sharpe": sharpe(r, ppy), "sortino": sortino(r, ppy)}
+    rep["var"], rep["cvar"] = var_cvar(r, alpha)
+    rep["alpha"] = alpha
+    w = min(window, len(r))
+    rs = rolling_sharpe(r, w, ppy) if w > 1 else np.array([np.nan])
+    rso = rolling_sortino(r, w, ppy) if w > 1 else np.array([np.nan])
+    rep["window"] = w
+    rep["rolling_sharpe"] = float(rs[-1]) if len(rs) else float("nan")
+    rep["rolling_sortino"] = float(rso[-1]) if len(rso) else float("nan")
+    rep["window_var"], rep["window_cvar"] = var_cvar(r[-w:], alpha) if w else (float("nan"),) * 2
+    rep.update(drawdowns(equity))
+    rep["turnover"] = turnover(traded, equity, ppy)
+    return rep
+
+def rolling_frame(equity: pd.Series, window: int = 30, freq: str = "1D") -> pd.DataFrame:
+    """Rolling Sharpe/Sortino and drawdown per freq period, e.g. for charts."""
+    equity = resample_equity(equity, freq)
+    ppy = periods_per_year(equity.index)
+    r = log_returns(equity)
+    eq = equity.to_numpy(dtype=float)
+    pad = np.array([np.nan])
+    return pd.DataFrame({
+        "sharpe": np.r_[pad, rolling_sharpe(r, window, ppy)] if len(r) >= window else np.nan,
+        "sortino": np.r_[pad, rolling_sortino(r, window, ppy)] if len(r) >= window else np.nan,
+        "drawdown": eq / np.maximum.accumulate(eq) - 1.0 if len(eq) else np.nan,
+    }, index=equity.index)
+
+def _f(x, fmt):
+    return "n/a" if x is None or not np.isfinite(x) else format(x, fmt)
+
+def format_report(rep: dict) -> list:
+    """Short text lines (Telegram/log)."""
+    lines = [
+        f"Sharpe: {_f(rep['sharpe'], '.2f')} (last {rep['window']}: {_f(rep['rolling_sharpe'], '.2f')})",
+        f"Sortino: {_f(rep['sortino'], '.2f')} (last {rep['window']}: {_f(rep['rolling_sortino'], '.2f')})",
+        f"VaR/CVaR {rep['alpha']:.0%}: {_f(rep['var'], '.2%')} / {_f(rep['cvar'], '.2%')} per period",
+        f"Max DD: {_f(rep['max_drawdown'], '.2%')} (longest {rep['max_dd_days']:.1f}d underwater)",
+        f"Current DD: {_f(rep['current_drawdown'], '.2%')} ({rep['current_dd_days']:.1f}d)",
+    ]
+    if np.isfinite(rep.get("turnover", float("nan"))):
+        lines.append(f"Turnover: {rep['turnover']:.1f}x / yr")
+    return lines
@@ -0,0 +1,28 @@
+# bot/rolling.py
+# Vectorized rolling kernels over 2-D arrays (rows = time, columns = assets),
+# shared by the regime classifier, the feature store and the risk report.
+import numpy as np
+
+def _rolling_sums(a: np.ndarray, window: int):
+    """Rolling (sum, sum of squares, count of non-NaN) along axis 0 of a 2-D array."""
+    valid = ~np.isnan(a)
+    x = np.where(valid, a, 0.0)
+    pad = np.zeros((1, a.shape[1]))
+    cs = np.vstack([pad, np.cumsum(x, axis=0)])
+    cs2 = np.vstack([pad, np.cumsum(x * x, axis=0)])
+    cn = np.vstack([pad, np.cumsum(valid, axis=0)])
+    out = [np.full(a.shape, np.nan) for _ in range(3)]
+    if a.shape[0] >= window:
+        for o, c in zip(out, (cs, cs2, cn)):
+            o[window - 1:] = c[window:] - c[:-window]
+    return out
+
+def rolling_mean_2d(a: np.ndarray, window: int) -> np.ndarray:
+    s, _, n = _rolling_sums(a, window)
+    return np.where(n == window, s / window, np.nan)
+
+def rolling_std_2d(a: np.ndarray, window: int) -> np.ndarray:
+    """Sample std (ddof=1, like pandas) over full windows only."""
+    s, s2, n = _rolling_sums(a, window)
+    var = (s2 - s * s / window) / (window - 1)
+    return np.where(n == window, np.sqrt(np.maximum(var, 0.0)), np.nan)
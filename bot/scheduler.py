@@ -0,0 +1,140 @@
+# bot/scheduler.py
+# TWAP/iceberg execution: each parent order is split into child slices spread
+# evenly over a horizon (no child above the depth clip). Every tick sends the
+# next child of each symbol on an asyncio loop; the signed order calls are
+# serialized per API key (nonce order, see exchange._SIGNED). Progress lives in
+# state["execution"], so an interrupted run resumes the remaining slices.
+import asyncio
+import math
+import time
+
+from .exchange import market_buy, market_sell
+
+# child status
+PENDING, SENT, DONE, FAILED, CANCELLED, UNKNOWN = (
+    "pending", "sent", "done", "failed", "cancelled", "unknown")
+
+# ---------- clocks ----------
+class Clock:
+    def now(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds))
+
+# ---------- sizing ----------
+def child_amounts(amount: float, slices: int = 1, clip: float = None, min_amount: float = 0.0):
+    """
+    Equal child amounts summing to amount: at least `slices` children (TWAP),
+    none above clip (iceberg), none below min_amount (fewer children instead).
+    """
+    if amount <= 0:
+        return []
+    n = max(1, int(slices))
+    if clip and clip > 0:
+        n = max(n, math.ceil(amount / clip))
+    if min_amount > 0:
+        n = max(1, min(n, int(amount // min_amount)))
+    return [amount / n] * n
+
+def build_schedule(parents: dict, horizon_s: float, now: float, bar_ms: int) -> dict:
+    """
+    parents: {symbol: (side, [child amounts])}. Children are sent one per symbol
+    per tick; ticks are horizon_s / (max children) apart.
+    bar_ms: daily bar the plan was made on (a schedule never outlives it).
+    """
+    ticks = max((len(c) for _, c in parents.values()), default=0)
+    return {
+        "created": float(now),
+        "bar": int(bar_ms),
+        "interval_s": float(horizon_s) / ticks if ticks else 0.0,
+        "orders": {s: {"side": side, "children": [{"amount": float(a), "status": PENDING} for a in children]}
+                   for s, (side, children) in parents.items() if children},
+    }
+
+def pending(schedule) -> bool:
+    return bool(schedule) and any(c["status"] == PENDING for o in schedule.get("orders", {}).values()
+                                  for c in o["children"])
+
+def progress(schedule) -> dict:
+    """{status: count} over all children."""
+    out = {}
+    for o in (schedule or {}).get("orders", {}).values():
+        for c in o["children"]:
+            out[c["status"]] = out.get(c["status"], 0) + 1
+    return out
+
+def prepare_resume(schedule) -> int:
+    """
+    Children left SENT by an interrupted run may or may not have filled; mark
+    them UNKNOWN so they are never re-sent. Returns how many were marked.
+    """
+    n = 0
+    for o in (schedule or {}).get("orders", {}).values():
+        for c in o["children"]:
+            if c["status"] == SENT:
+                c["status"] = UNKNOWN
+                n += 1
+    return n
+
+# ---------- execution ----------
+async def _send(client, symbol: str, side: str, child: dict, sem: asyncio.Semaphore):
+    fn = market_buy if side == "buy" else market_sell
+    async with sem:
+        # ccxt sync clients block: run them in the default thread pool
+        return await asyncio.get_running_loop().run_in_executor(None, fn, client, symbol, child["amount"])
+
+async def run_schedule(client, schedule: dict, clock: Clock = None, allowed=None, on_update=None,
+                       on_fill=None, max_concurrent: int = 1):
+    """
+    Send the remaining children tick by tick until none are pending or
+    allowed() turns False (the rest stays PENDING for the next run).
+    on_update() runs after every state change (persist the schedule there);
+    on_fill(symbol, side, child, result_or_exception) reports each child.
+    A failed child cancels the rest of its parent.
+    """
+    clock = clock or Clock()
+    allowed = allowed or (lambda: True)
+    sem = asyncio.Semaphore(max(1, int(max_concurrent)))
+    orders = schedule.get("orders", {})
+    first = True
+    while pending(schedule):
+        if not allowed():
+            break
+        if not first:
+            await clock.sleep(schedule.get("interval_s", 0.0))
+            if not allowed():
+                break
+        first = False
+        due = []
+        for s, o in orders.items():
+            child = next((c for c in o["children"] if c["status"] == PENDING), None)
+            if child is not None:
+                child["status"] = SENT
+                child["ts"] = clock.now()
+                due.append((s, o["side"], child))
+        if on_update:
+            on_update()  # SENT is on disk before any order goes out
+        results = await asyncio.gather(*(_send(client, s, side, c, sem) for s, side, c in due),
+                                       return_exceptions=True)
+        for (s, side, child), res in zip(due, results):
+            if isinstance(res, BaseException):
+                child["status"] = FAILED
+                child["error"] = str(res)
+                for c in orders[s]["children"]:
+                    if c["status"] == PENDING:
+                        c["status"] = CANCELLED
+            else:
+                child["status"] = DONE
+                child["id"] = (res or {}).get("id")
+            if on_fill:
+                on_fill(s, side, child, res)
+        if on_update:
+            on_update()
+    return progress(schedule)
+
+def execute(client, schedule: dict, clock: Clock = None, allowed=None, on_update=None, on_fill=None,
+            max_concurrent: int = 1) -> dict:
+    """Blocking entry point for trade.main."""
+    return asyncio.run(run_schedule(client, schedule, clock=clock, allowed=allowed, on_update=on_update,
+                                    on_fill=on_fill, max_concurrent=max_concurrent))
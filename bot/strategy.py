@@ -2,14 +2,17 @@
 import numpy as np
 import pandas as pd
 
-def _inv_vol_weights(closes: pd.DataFrame, selected, floor=1e-9, window=20):
+def _inv_vol_weights(closes: pd.DataFrame, selected, floor=1e-9, window=20, features=None):
     sub = closes[selected].dropna()
     if len(sub) < window + 2:
         # fallback equal weights
         w = np.ones(len(selected)) / max(1, len(selected))
         return {s: float(x) for s, x in zip(selected, w)}
-    rets = np.log(sub).diff().iloc[-window:]
-    vol = rets.std() * np.sqrt(365)  # annualized-ish
+    if features is not None:
+        vol = features.tail_vol(window)[list(selected)]
+    else:
+        rets = np.log(sub).diff().iloc[-window:]
+        vol = rets.std() * np.sqrt(365)  # annualized-ish
     vol = vol.replace(0, floor).fillna(vol.median() or 1.0)
     inv = 1.0 / vol
     w = inv / inv.sum()
@@ -64,9 +67,16 @@ def _cap_turnover(new_w: dict, prev_w: dict, cap_per_asset=0.10):
     return capped
 
 def vol_target_weights(closes, selected, all_symbols, min_w=0.05, max_w=0.6,
-                       cash_buffer=0.15, turnover_cap=0.10, prev_weights=None):
-    base = _inv_vol_weights(closes, selected, window=20)
+                       cash_buffer=0.15, turnover_cap=0.10, prev_weights=None,
+                       asset_scale=None, features=None):
+    base = _inv_vol_weights(closes, selected, window=20, features=features)
     bounded = _apply_bounds_and_cash(base, all_symbols, min_w, max_w, cash_buffer)
+    if asset_scale:
+        # per-asset multipliers (e.g. regime.asset_scales) after normalization,
+        # so a cut goes to cash instead of to the other assets
+        for s, w in bounded.items():
+            cut = w * float(asset_scale.get(s, 1.0))
+            bounded[s] = max(cut, min_w) if cut > 0 else 0.0
     if prev_weights:
         bounded = _cap_turnover(bounded, prev_weights, cap_per_asset=turnover_cap)
     return {s: float(bounded.get(s, 0.0)) for s in all_symbols}
@@ -1,29 +1,22 @@
 # bot/summary.py
 import math
+import sys
 import time
 import json
 import pathlib
 from typing import List, Tuple, Optional
 
-import requests
 import yaml
 
-from .utils import env
+from . import notify
+from .risk import equity_series, risk_report, format_report
 
 # ---------- Telegram ----------
 def _tg_enabled() -> bool:
-    return bool(env("TELEGRAM_BOT_TOKEN") and env("TELEGRAM_CHAT_ID"))
+    return notify.telegram().enabled
 
 def _tg_send(text: str):
-    token = env("TELEGRAM_BOT_TOKEN")
-    chat_id = env("TELEGRAM_CHAT_ID")
-    if not token or not chat_id:
-        return
-    try:
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        requests.post(url, data={"chat_id": chat_id, "text": text})
-    except Exception:
-        pass  # never fail the job because of Telegram
+    notify.telegram().send(text)  # queued; batched and posted in the background
 
 # ---------- Helpers ----------
 def _load_cfg_and_state() -> Tuple[dict, dict, pathlib.Path]:
@@ -70,7 +63,7 @@ def _build_plan_line(last_plan: dict) -> str:
     parts = [f"{k} {float(v):.0%}" for k, v in w.items() if float(v) > 0]
     return "Plan: " + (", ".join(parts) if parts else "(none)") + f" | cash ~{cash:.0%}"
 
-def main():
+def main(risk: bool = False):
     cfg, state, _ = _load_cfg_and_state()
     base = (cfg.get("trading") or {}).get("base_ccy", "USD")
 
@@ -78,6 +71,7 @@ def main():
     if len(eh) == 0:
         if _tg_enabled():
             _tg_send(f"📊 PnL Summary ({base})\nNo equity data yet.")
+            notify.telegram().flush()
         return
 
     # Ensure numeric types
@@ -121,9 +115,17 @@ def main():
     # Add plan context
     lines.append(_build_plan_line(state.get("last_plan")))
 
+    # Risk section (weekly workflow passes --risk)
+    if risk:
+        eq = equity_series(hist)
+        if len(eq) >= 3:
+            lines.append("Risk:")
+            lines.extend(format_report(risk_report(eq)))
+
     msg = "\n".join(lines)
     if _tg_enabled():
         _tg_send(msg)
+        notify.telegram().flush()
 
 if __name__ == "__main__":
-    main()
+    main(risk="--risk" in sys.argv[1:])
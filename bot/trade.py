@@ -1,35 +1,38 @@
 # bot/trade.py
 import time
 from typing import Dict, List
-import requests
+import numpy as np
+import pandas as pd
 
-from .utils import load_config, setup_logging, load_state, save_state, env
+from .utils import load_config, setup_logging, load_state, save_state
+from . import notify
 from .exchange import (
-    make_client, price, balance_of, market_buy, market_sell,
-    load_markets, min_trade_constraints, amount_to_precision
+    make_client, price, prices, balances, balance_of, market_buy, market_sell,
+    min_trade_constraints, amount_to_precision
 )
+from .markets import load_constraints, cache_settings
+from . import paper
+from .depth import fetch_order_books, size_with_depth, max_amount_within, refreshed_cap
+from . import scheduler
 from .data import stack_closes
+from .venues import MultiVenueClient
+from .candles import CandleStore, bucket_start
+from .resilience import merge_latency, format_latency, BudgetExceededError
+from .features import FeatureStore
+from .cache import ResultCache
 from .quantum_alloc import select_assets
 from .strategy import vol_target_weights
-from .regime import market_regime
+from .regime import market_regime, asset_regimes, asset_scales, REGIME_MIN_BARS
 
 INITIAL_EQUITY = 1000.0
 USER_MIN_NOTIONAL = 10.0  # skip trades below $10 notional
 
 # ---------------- Telegram helpers ----------------
 def _tg_enabled() -> bool:
-    return bool(env("TELEGRAM_BOT_TOKEN") and env("TELEGRAM_CHAT_ID"))
+    return notify.telegram().enabled
 
 def _tg_send(text: str):
-    token = env("TELEGRAM_BOT_TOKEN")
-    chat_id = env("TELEGRAM_CHAT_ID")
-    if not token or not chat_id:
-        return
-    try:
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        requests.post(url, data={"chat_id": chat_id, "text": text})
-    except Exception:
-        pass
+    notify.telegram().send(text)  # queued; batched and posted in the background
 
 # ---------------- Equity bookkeeping ----------------
 def _ensure_equity_history(state: dict):
@@ -51,21 +54,56 @@ def _record_live_equity(state: dict, client, symbols: List[str], base_ccy: str)
     state["equity_history"].append([int(time.time()), float(equity)])
     return float(equity)
 
-def _record_paper_equity(state: dict, closes, weights: Dict[str, float]):
-    if closes.shape[0] < 2:
-        last_eq = float(state["equity_history"][-1][1])
-        state["equity_history"].append([int(time.time()), last_eq])
-        return
-    prev = closes.iloc[-2]; curr = closes.iloc[-1]
-    port_ret = 0.0
-    if sum(weights.values()) > 0:
-        for s, w in weights.items():
-            if w > 0 and s in prev.index and s in curr.index:
-                r = (float(curr[s]) - float(prev[s])) / float(prev[s])
-                port_ret += w * r
-    last_eq = float(state["equity_history"][-1][1])
-    equity = last_eq * (1.0 + port_ret)
+def _post_trade_equity(state: dict, client, symbols: List[str], base_ccy: str, log):
+    """Mark post-trade equity unless the latency budget is spent (the reads would fail)."""
+    if getattr(client, "budget_exceeded", lambda: False)():
+        log.warning("Latency budget spent: post-trade equity not recorded this run.")
+        return None
+    try:
+        eq_post = _record_live_equity(state, client, symbols, base_ccy)
+    except Exception as e:
+        log.warning(f"Post-trade equity read failed: {e}")
+        return None
+    log.info(f"Post-trade equity (USD): {eq_post:.2f}")
+    if _tg_enabled(): _tg_send(f"ℹ️ Post-trade equity: ${eq_post:,.2f}")
+    return eq_post
+
+def _record_paper_equity(state: dict, closes, weights: Dict[str, float], snapshot: dict,
+                         paper_cfg: dict, log) -> float:
+    """Simulate the live order loop at the latest closes and mark the paper book."""
+    symbols = list(closes.columns)
+    book = state.get("paper_book") or {}
+    if not book:
+        book = {"cash": float(state["equity_history"][-1][1]), "holdings": {}}
+    holdings = np.array([float(book["holdings"].get(s, 0.0)) for s in symbols])
+    px = closes.iloc[-1].to_numpy(dtype=float)
+
+    cons = paper.constraint_arrays(snapshot, symbols)
+    equity = book["cash"] + float(np.dot(holdings, np.nan_to_num(px)))
+    orders, status, min_not = paper.plan_orders(
+        equity, [weights.get(s, 0.0) for s in symbols], holdings, px, cons,
+        min_notional=USER_MIN_NOTIONAL)
+    cash, holdings, status, fees = paper.execute_orders(
+        orders, status, px, book["cash"], holdings,
+        fee_rate=float(paper_cfg.get("fee_rate", 0.0026)),
+        slippage_bps=float(paper_cfg.get("slippage_bps", 5.0)))
+
+    for s, o, st, mn in zip(symbols, orders, status, min_not):
+        if st == paper.FILLED:
+            log.info(f"PAPER {'BUY' if o > 0 else 'SELL'} {s} amount={abs(o):.10f}")
+        elif st == paper.SKIP_MIN_NOTIONAL:
+            log.info(f"PAPER skip {s}: notional below min ${mn:.2f}")
+        else:
+            log.info(f"PAPER skip {s}: {paper.STATUS_TEXT[st]}")
+
+    state["paper_book"] = {
+        "cash": cash,
+        "holdings": {s: float(h) for s, h in zip(symbols, holdings) if h > 0},
+    }
+    equity = cash + float(np.dot(holdings, np.nan_to_num(px)))
+    log.info(f"PAPER equity: {equity:.2f} (fees {fees:.2f})")
     state["equity_history"].append([int(time.time()), float(equity)])
+    return equity
 
 # ---------------- Config knobs ----------------
 def _read_regime_knobs(trading_cfg: dict):
@@ -87,6 +125,129 @@ def _read_regime_knobs(trading_cfg: dict):
     turnover_cap = float((trading_cfg or {}).get("turnover_cap", 0.10))
     return knobs, turnover_cap
 
+def _read_asset_regime(trading_cfg: dict):
+    """Per-asset regime handling: mode off | filter | downweight, plus regime -> weight scale."""
+    ar = (trading_cfg or {}).get("asset_regime") or {}
+    mode = (ar.get("mode") or "off").lower()
+    scales = {"bull": 1.0, "chop": float(ar.get("chop_scale", 1.0)), "bear": float(ar.get("bear_scale", 0.5))}
+    return mode, scales
+
+def _apply_asset_regimes(closes, mode: str, scales: dict, features=None, history=None):
+    """
+    (candidate closes for selection, weight multipliers or None).
+    filter drops bear assets from selection unless that would leave nothing.
+    Regimes are classified on history (a longer panel) when given; features
+    must then be built over history (with closes as its window).
+    """
+    if mode == "off":
+        return closes, None
+    regimes = asset_regimes(closes if history is None else history, features=features)
+    if mode == "filter":
+        keep = [s for s, r in regimes["regime"].items() if r != "bear"]
+        return (closes[keep] if keep else closes), None
+    return closes, asset_scales(regimes, scales)
+
+def _finish(state_path: str, state: dict, client, log):
+    """Persist state (with accumulated per-endpoint latency) and flush notifications."""
+    latency = getattr(client, "latency", None)
+    if latency:
+        log.info(f"Exchange latency: {format_latency(latency)}")
+        state["latency"] = merge_latency(state.get("latency"), latency)
+    save_state(state_path, state)
+    notify.telegram().flush()
+
+def _orders_allowed(client, log) -> bool:
+    """False once the run's latency budget is spent: degrade to plan-only."""
+    if getattr(client, "budget_exceeded", lambda: False)():
+        msg = "⏱️ Latency budget exhausted: plan only, remaining orders skipped."
+        log.warning(msg)
+        if _tg_enabled(): _tg_send(msg)
+        return False
+    return True
+
+# ---------------- Scheduled (TWAP/iceberg) execution ----------------
+def _run_schedule(state: dict, state_path: str, client, execution: dict, log) -> dict:
+    """Send the pending children of state["execution"], checkpointing state after each tick."""
+    sched = state["execution"]
+
+    def _on_fill(s, side, child, res):
+        if isinstance(res, BaseException):
+            log.error(f"Order error for {s}: {res}")
+            if _tg_enabled(): _tg_send(f"❌ Order error {s}: {res} (rest of {s} cancelled)")
+        else:
+            log.info(f"{side.upper()} {s} amount={child['amount']:.10f} (slice)")
+            if _tg_enabled(): _tg_send(f"✅ {side.upper()} {s} {child['amount']:.10f}")
+
+    done = scheduler.execute(client, sched, allowed=lambda: _orders_allowed(client, log),
+                             on_update=lambda: save_state(state_path, state), on_fill=_on_fill,
+                             max_concurrent=int(execution.get("max_concurrent", 1)))
+    log.info(f"Schedule progress: {done}")
+    if not scheduler.pending(sched):
+        state["execution"] = None
+    return done
+
+def _resume_schedule(state: dict, state_path: str, client, execution: dict, log) -> bool:
+    """
+    Resume an interrupted schedule from the same daily bar. Returns True if it
+    ran (the caller then skips re-planning). A schedule from an older bar is
+    dropped: the new bar gets a fresh plan.
+    """
+    sched = state.get("execution")
+    if not scheduler.pending(sched):
+        return False
+    if int(sched.get("bar", 0)) != int(bucket_start(int(time.time() * 1000), "1d")):
+        log.info(f"Dropping stale schedule from bar {sched.get('bar')}: {scheduler.progress(sched)}")
+        state["execution"] = None
+        return False
+    unknown = scheduler.prepare_resume(sched)
+    msg = f"⏯️ Resuming schedule: {scheduler.progress(sched)}"
+    if unknown:
+        msg += f" ({unknown} in-flight slices not re-sent)"
+    log.info(msg)
+    if _tg_enabled(): _tg_send(msg)
+    _run_schedule(state, state_path, client, execution, log)
+    return True
+
+# ---------------- Fast path ----------------
+def _fast_path_check(state: dict, client, symbols: List[str], base_ccy: str, records: dict, mode: str):
+    """
+    Cheap pre-check before the full pipeline: one balance + one bulk ticker call
+    (paper: tickers only). Returns (skip, equity, reason). skip is True when no
+    daily bar has closed since last_plan.ts and sizing last_plan.weights against
+    current holdings would place no order (every diff below the trade minimums).
+    """
+    plan = state.get("last_plan") or {}
+    if not plan.get("weights") or not plan.get("ts"):
+        return False, None, "no previous plan"
+    now_ms = int(time.time() * 1000)
+    if int(bucket_start(now_ms, "1d")) > int(plan["ts"]) * 1000:
+        return False, None, "new daily bar since last plan"
+
+    if mode == "paper":
+        book = state.get("paper_book")
+        if not book:
+            return False, None, "no paper book"
+        cash = float(book["cash"])
+        holdings = np.array([float(book["holdings"].get(s, 0.0)) for s in symbols])
+    else:
+        bal = balances(client)
+        cash = float(bal.get("free", {}).get(base_ccy, 0.0)) + float(bal.get("used", {}).get(base_ccy, 0.0))
+        holdings = np.array([float(bal.get("total", {}).get(s.split("/")[0], 0.0) or 0.0) for s in symbols])
+
+    px_map = prices(client, symbols)
+    px = np.array([float(px_map.get(s) or 0.0) for s in symbols])
+    if (px <= 0).any():
+        return False, None, "missing prices"
+    equity = cash + float(np.dot(holdings, px))
+
+    weights = [float(plan["weights"].get(s, 0.0)) for s in symbols]
+    _, status, _ = paper.plan_orders(equity, weights, holdings, px,
+                                     paper.constraint_arrays(records, symbols),
+                                     min_notional=USER_MIN_NOTIONAL)
+    if (status == paper.FILLED).any():
+        return False, equity, "holdings drifted from last plan"
+    return True, equity, "no new bar and no drift above trade minimums"
+
 def main():
     log = setup_logging("INFO")
     cfg = load_config("config.yml")
@@ -96,6 +257,7 @@ def main():
     base = trading.get("base_ccy", "USD")
     symbols = trading.get("symbols") or ["BTC/USD", "ETH/USD", "SOL/USD"]
     lookback = int(trading.get("lookback_days", 90))
+    regime_lookback = int(trading.get("regime_lookback_days", 200))
     min_w = float(trading.get("min_weight", 0.05))
     max_w = float(trading.get("max_weight", 0.6))
     mode = cfg.get("mode", "paper")
@@ -104,138 +266,246 @@ def main():
     selection_cfg = (trading.get("selection") or {})
     # Optional knobs
     regime_knobs, turnover_cap = _read_regime_knobs(trading)
+    ar_mode, ar_scales = _read_asset_regime(trading)
+    execution = cfg.get("execution") or {}
+    impact_budget = float(execution.get("impact_budget_bps", 0.0))  # 0 disables the depth check
+    depth_mode = execution.get("depth_mode", "cap")
+    depth_levels = int(execution.get("book_depth", 50))
+    max_slices = int(execution.get("max_slices", 4))
+    slice_delay = float(execution.get("slice_delay_s", 2.0))
+    sched_mode = execution.get("scheduler", "none")  # none | twap
 
     state_path = cfg.get("state_file", "state/state.json")
     state = load_state(state_path)
     _ensure_equity_history(state)
 
-    client = make_client(ex_name)
-    load_markets(client)
-
-    closes = stack_closes(client, symbols, timeframe="1d", lookback_days=lookback)
-
-    # --- Regime & dynamic parameters ---
-    regime = market_regime(closes, benchmark="BTC/USD")
-    rk = regime_knobs.get(regime, regime_knobs["chop"])
-    dyn_cash = rk["cash_buffer"]
-    dyn_maxpos = rk["max_positions"]
-    lam = rk["lam"]
-    log.info(f"Regime: {regime} | dyn_cash={dyn_cash}, dyn_maxpos={dyn_maxpos}, lam={lam}, turnover_cap={turnover_cap}")
-
-    # --- Selection (expected_return or risk_adjusted) ---
-    # Pass lam for risk_adjusted; it is ignored by expected_return mode.
-    chosen = select_assets(closes, max_positions=dyn_maxpos, lam=lam, selection_cfg=selection_cfg)
-
-    # --- Weights: inverse-vol + bounds + cash + turnover cap ---
-    prev_weights = (state.get("last_plan") or {}).get("weights", {})
-    weights = vol_target_weights(
-        closes, selected=chosen, all_symbols=symbols,
-        min_w=min_w, max_w=max_w, cash_buffer=dyn_cash,
-        turnover_cap=turnover_cap, prev_weights=prev_weights
-    )
-
-    # Plan summary (log + Telegram)
-    plan_lines = [f"{s} {weights.get(s,0):.0%}" for s in symbols if weights.get(s,0) > 0]
-    cash_pct = f"{dyn_cash:.0%}"
-    log.info(f"Selected: {chosen}")
-    log.info(f"Target weights: {weights} (cash buffer {dyn_cash}) regime={regime}")
-    if _tg_enabled():
-        sel_mode = (selection_cfg.get("mode") or "risk_adjusted").lower()
-        _tg_send("📣 Plan "
-                 f"({mode.upper()}, regime={regime}, sel={sel_mode}): "
-                 + (", ".join(plan_lines) if plan_lines else "no positions")
-                 + f" | cash {cash_pct}")
-
-    state["last_plan"] = {
-        "chosen": chosen,
-        "weights": weights,
-        "regime": regime,
-        "ts": int(time.time())
-    }
+    client = make_client(ex_name, cfg.get("resilience"))
+    # Every exit below (return, budget, error) persists state through _finish
+    try:
+        markets_path, markets_ttl = cache_settings(cfg)
+        records = load_constraints(client, symbols, path=markets_path, ttl_hours=markets_ttl)
 
-    if mode == "paper":
-        _record_paper_equity(state, closes, weights)
-        log.info("PAPER mode: no orders will be placed.")
-        save_state(state_path, state)
-        return
-
-    # LIVE: pre-trade equity (alert)
-    eq_pre = _record_live_equity(state, client, symbols, base)
-    log.info(f"Pre-trade equity (USD): {eq_pre:.2f}")
-    if _tg_enabled(): _tg_send(f"💼 Pre-trade equity: ${eq_pre:,.2f}")
-
-    # Compute total equity (base + coins) for sizing
-    _, free_base, used_base = balance_of(client, base)
-    equity = free_base + used_base
-    for s in symbols:
-        asset = s.split("/")[0]
-        tot, _, _ = balance_of(client, asset)
-        if tot and tot > 0:
+        # --- Interrupted TWAP schedule from this bar: finish it instead of re-sizing ---
+        if mode != "paper" and _resume_schedule(state, state_path, client, execution, log):
+            _post_trade_equity(state, client, symbols, base, log)
+            return
+
+        # --- Fast path: skip the pipeline when nothing can have changed ---
+        if (cfg.get("fast_path") or {}).get("enabled", False):
             try:
-                px = price(client, s)
-                if px:
-                    equity += tot * px
-            except Exception:
-                pass
-
-    # Targets in asset units
-    targets = {}
-    for s in symbols:
-        p = price(client, s)
-        targets[s] = (equity * weights.get(s, 0.0)) / p if p else 0.0
+                skip, eq_now, reason = _fast_path_check(state, client, symbols, base, records, mode)
+            except Exception as e:
+                skip, eq_now, reason = False, None, f"check failed: {e}"
+            log.info(f"Fast path: {'skip' if skip else 'full run'} ({reason})")
+            if skip:
+                state["equity_history"].append([int(time.time()), float(eq_now)])
+                return
 
-    # Execute respecting exchange minimums (with Telegram)
-    for s in symbols:
-        p = price(client, s)
-        if not p:
-            msg = f"⚠️ Skip {s}: no price."
-            log.info(msg)
-            if _tg_enabled(): _tg_send(msg)
-            continue
-
-        cons = min_trade_constraints(client, s, p)
-        min_cost_ex = cons["min_cost"]
-        min_amt_ex = cons["min_amount"]
-        min_notional = max(USER_MIN_NOTIONAL, min_cost_ex)
+        # Candles from several venues when data_sources is enabled, else the trading client
+        data_client = MultiVenueClient.from_config(cfg, client, ex_name, health=state.get("venue_health"))
+        history = stack_closes(data_client or client, symbols, timeframe="1d",
+                               lookback_days=max(lookback, regime_lookback), store=CandleStore.from_config(cfg))
+        # selection/weights keep the lookback_days window; regimes read the longer history
+        closes = history[history.index >= pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=lookback)]
+        if len(history) < REGIME_MIN_BARS:
+            log.warning(f"Only {len(history)} daily bars (< {REGIME_MIN_BARS}): regimes default to chop. "
+                        f"Raise trading.regime_lookback_days.")
+        if data_client is not None:
+            log.info(f"Data venues: {data_client.format_report()}")
+            state["venue_health"] = data_client.health_state()
 
-        asset = s.split("/")[0]
-        cur_total, _, _ = balance_of(client, asset)
-        diff = targets[s] - cur_total
-        notional = abs(diff) * p
-
-        if notional < min_notional:
-            msg = f"⏭️ Skip {s}: notional ${notional:.2f} < min ${min_notional:.2f}"
-            log.info(msg)
-            if _tg_enabled(): _tg_send(msg)
-            continue
-
-        order_amt = abs(diff)
-        if min_amt_ex and order_amt < min_amt_ex:
-            order_amt = min_amt_ex
-        order_amt = amount_to_precision(client, s, order_amt)
-        if order_amt <= 0:
-            msg = f"⏭️ Skip {s}: rounded amount too small."
-            log.info(msg)
-            if _tg_enabled(): _tg_send(msg)
-            continue
-
-        try:
-            if diff > 0:
-                log.info(f"BUY {s} amount={order_amt:.10f} (min_cost≈{min_cost_ex:.2f})")
-                market_buy(client, s, order_amt)
-                if _tg_enabled(): _tg_send(f"✅ BUY {s} {order_amt:.10f}")
-            else:
-                log.info(f"SELL {s} amount={order_amt:.10f} (min_cost≈{min_cost_ex:.2f})")
-                market_sell(client, s, order_amt)
-                if _tg_enabled(): _tg_send(f"✅ SELL {s} {order_amt:.10f}")
-        except Exception as e:
-            log.exception(f"Order error for {s}: {e}")
-            if _tg_enabled(): _tg_send(f"❌ Order error {s}: {e}")
-
-    eq_post = _record_live_equity(state, client, symbols, base)
-    log.info(f"Post-trade equity (USD): {eq_post:.2f}")
-    if _tg_enabled(): _tg_send(f"ℹ️ Post-trade equity: ${eq_post:,.2f}")
-    save_state(state_path, state)
+        # Shared returns/rolling stats: regimes over history, selection/weights over closes
+        features = FeatureStore(history, window=len(closes))
+
+        # --- Regime & dynamic parameters ---
+        regime = market_regime(history, benchmark="BTC/USD", features=features)
+        rk = regime_knobs.get(regime, regime_knobs["chop"])
+        dyn_cash = rk["cash_buffer"]
+        dyn_maxpos = rk["max_positions"]
+        lam = rk["lam"]
+        log.info(f"Regime: {regime} | dyn_cash={dyn_cash}, dyn_maxpos={dyn_maxpos}, lam={lam}, turnover_cap={turnover_cap}")
+
+        # --- Per-asset regimes: filter candidates or down-weight (optional) ---
+        candidates, scale = _apply_asset_regimes(closes, ar_mode, ar_scales, features=features,
+                                                 history=history)
+        if ar_mode != "off":
+            log.info(f"Asset regimes ({ar_mode}): candidates={list(candidates.columns)} scale={scale}")
+
+        # --- Selection (expected_return or risk_adjusted) ---
+        # Pass lam for risk_adjusted; it is ignored by expected_return mode.
+        prev_chosen = (state.get("last_plan") or {}).get("chosen")
+        chosen = select_assets(candidates, max_positions=dyn_maxpos, lam=lam, selection_cfg=selection_cfg,
+                               warm_start=prev_chosen, features=features, cache=ResultCache.from_config(cfg))
+
+        # --- Weights: inverse-vol + bounds + cash + turnover cap ---
+        prev_weights = (state.get("last_plan") or {}).get("weights", {})
+        weights = vol_target_weights(
+            closes, selected=chosen, all_symbols=symbols,
+            min_w=min_w, max_w=max_w, cash_buffer=dyn_cash,
+            turnover_cap=turnover_cap, prev_weights=prev_weights, asset_scale=scale,
+            features=features
+        )
+
+        # Plan summary (log + Telegram)
+        plan_lines = [f"{s} {weights.get(s,0):.0%}" for s in symbols if weights.get(s,0) > 0]
+        cash_pct = f"{dyn_cash:.0%}"
+        log.info(f"Selected: {chosen}")
+        log.info(f"Target weights: {weights} (cash buffer {dyn_cash}) regime={regime}")
+        if _tg_enabled():
+            sel_mode = (selection_cfg.get("mode") or "risk_adjusted").lower()
+            _tg_send("📣 Plan "
+                     f"({mode.upper()}, regime={regime}, sel={sel_mode}): "
+                     + (", ".join(plan_lines) if plan_lines else "no positions")
+                     + f" | cash {cash_pct}")
+
+        state["last_plan"] = {
+            "chosen": chosen,
+            "weights": weights,
+            "regime": regime,
+            "ts": int(time.time())
+        }
+
+        if mode == "paper":
+            _record_paper_equity(state, closes, weights, records, cfg.get("paper") or {}, log)
+            log.info("PAPER mode: orders simulated, none placed.")
+            return
+
+        # LIVE: pre-trade equity (alert)
+        eq_pre = _record_live_equity(state, client, symbols, base)
+        log.info(f"Pre-trade equity (USD): {eq_pre:.2f}")
+        if _tg_enabled(): _tg_send(f"💼 Pre-trade equity: ${eq_pre:,.2f}")
+
+        # Compute total equity (base + coins) for sizing
+        _, free_base, used_base = balance_of(client, base)
+        equity = free_base + used_base
+        for s in symbols:
+            asset = s.split("/")[0]
+            tot, _, _ = balance_of(client, asset)
+            if tot and tot > 0:
+                try:
+                    px = price(client, s)
+                    if px:
+                        equity += tot * px
+                except Exception:
+                    pass
+
+        # Targets in asset units
+        targets = {}
+        for s in symbols:
+            p = price(client, s)
+            targets[s] = (equity * weights.get(s, 0.0)) / p if p else 0.0
+
+        # Plan orders respecting exchange minimums (with Telegram)
+        planned = []
+        for s in symbols:
+            p = price(client, s)
+            if not p:
+                msg = f"⚠️ Skip {s}: no price."
+                log.info(msg)
+                if _tg_enabled(): _tg_send(msg)
+                continue
+
+            cons = min_trade_constraints(client, s, p, records)
+            min_cost_ex = cons["min_cost"]
+            min_amt_ex = cons["min_amount"]
+            min_notional = max(USER_MIN_NOTIONAL, min_cost_ex)
+
+            asset = s.split("/")[0]
+            cur_total, _, _ = balance_of(client, asset)
+            diff = targets[s] - cur_total
+            notional = abs(diff) * p
+
+            if notional < min_notional:
+                msg = f"⏭️ Skip {s}: notional ${notional:.2f} < min ${min_notional:.2f}"
+                log.info(msg)
+                if _tg_enabled(): _tg_send(msg)
+                continue
+
+            order_amt = abs(diff)
+            if min_amt_ex and order_amt < min_amt_ex:
+                order_amt = min_amt_ex
+            order_amt = amount_to_precision(client, s, order_amt, records)
+            if order_amt <= 0:
+                msg = f"⏭️ Skip {s}: rounded amount too small."
+                log.info(msg)
+                if _tg_enabled(): _tg_send(msg)
+                continue
+
+            planned.append((s, diff, order_amt, p, min_cost_ex, max(min_amt_ex, min_notional / p)))
+
+        # Depth check: one concurrent round of order books for the symbols that trade
+        books = fetch_order_books(client, [o[0] for o in planned], limit=depth_levels) if impact_budget else {}
+
+        if sched_mode == "twap":
+            # Each parent becomes >= twap_slices children over horizon_s; with a
+            # depth budget no child exceeds what the book absorbs within it.
+            parents = {}
+            for s, diff, order_amt, p, min_cost_ex, min_slice in planned:
+                side = "buy" if diff > 0 else "sell"
+                clip = max_amount_within(books.get(s), side, impact_budget) if books.get(s) else None
+                kids = scheduler.child_amounts(order_amt, int(execution.get("twap_slices", 4)),
+                                               clip=clip, min_amount=min_slice)
+                kids = [a for a in (amount_to_precision(client, s, x, records) for x in kids) if a > 0]
+                parents[s] = (side, kids)
+                log.info(f"TWAP {s}: {side} {order_amt:.10f} -> {len(kids)} slices")
+            state["execution"] = scheduler.build_schedule(
+                parents, float(execution.get("horizon_s", 300)), time.time(),
+                int(bucket_start(int(time.time() * 1000), "1d")))
+            save_state(state_path, state)
+            _run_schedule(state, state_path, client, execution, log)
+            planned = []  # sent by the scheduler
+
+        for s, diff, order_amt, p, min_cost_ex, min_slice in planned:
+            if not _orders_allowed(client, log):
+                break
+            side = "buy" if diff > 0 else "sell"
+            slices = [order_amt]
+            if impact_budget:
+                slices = size_with_depth(order_amt, side, books.get(s), impact_budget, mode=depth_mode,
+                                         max_slices=max_slices, min_amount=min_slice)
+                slices = [a for a in (amount_to_precision(client, s, x, records) for x in slices) if a > 0]
+                if slices != [order_amt]:
+                    msg = (f"📉 Depth {s}: {side} {order_amt:.10f} -> {len(slices)} x "
+                           f"<= {max(slices, default=0.0):.10f} (impact budget {impact_budget:g} bps)")
+                    log.info(msg)
+                    if _tg_enabled(): _tg_send(msg)
+
+            left = sum(slices)
+            for i, amt in enumerate(slices):
+                if i > 0:
+                    if not _orders_allowed(client, log):
+                        break
+                    if slice_delay:
+                        time.sleep(slice_delay)  # let the book refill between child orders
+                    # size this child on the refilled book, not the first one
+                    clip = refreshed_cap(client, s, side, impact_budget, slices[0], limit=depth_levels)
+                    amt = amount_to_precision(client, s, min(left, clip), records)
+                    if amt < min_slice:
+                        log.info(f"⏭️ {s}: next slice {amt:.10f} below minimum, stopping")
+                        break
+                try:
+                    if side == "buy":
+                        log.info(f"BUY {s} amount={amt:.10f} (min_cost≈{min_cost_ex:.2f})")
+                        market_buy(client, s, amt)
+                        if _tg_enabled(): _tg_send(f"✅ BUY {s} {amt:.10f}")
+                    else:
+                        log.info(f"SELL {s} amount={amt:.10f} (min_cost≈{min_cost_ex:.2f})")
+                        market_sell(client, s, amt)
+                        if _tg_enabled(): _tg_send(f"✅ SELL {s} {amt:.10f}")
+                except Exception as e:
+                    log.exception(f"Order error for {s}: {e}")
+                    if _tg_enabled(): _tg_send(f"❌ Order error {s}: {e}")
+                    break
+                left -= amt
+                if left <= 0:
+                    break
+
+        _post_trade_equity(state, client, symbols, base, log)
+    except BudgetExceededError as e:
+        log.warning(f"Latency budget spent ({e}): run ended early, remaining steps skipped.")
+    finally:
+        # orders may already be out: always persist last_plan/equity/latency
+        _finish(state_path, state, client, log)
 
 if __name__ == "__main__":
     main()
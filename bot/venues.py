@@ -0,0 +1,197 @@
+# bot/venues.py
+# Multi-venue candles: fetch_ohlcv goes to several exchanges in parallel, the
+# first good answer within the latency budget wins, and whatever the other
+# venues return by then fills its gaps/stale tail and outvotes bad closes.
+# A per-venue health score (success, latency, agreement) picks who is asked.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from .candles import TIMEFRAME_MS, bucket_start
+
+HEALTH_DECAY = 0.8  # EWMA weight on history per observation
+
+def _rows(df: pd.DataFrame):
+    """ts-indexed OHLCV frame -> ccxt-style [[ts_ms, o, h, l, c, v], ...]."""
+    return [[int(ts), *map(float, vals)] for ts, vals in zip(df.index, df.to_numpy())]
+
+class VenueHealth:
+    """EWMA of success, latency and agreement per venue; score in [0, 1]."""
+
+    def __init__(self, names, history: dict = None):
+        self.stats = {n: {"ok": 1.0, "latency_ms": 0.0, "agree": 1.0, "count": 0} for n in names}
+        for n, h in (history or {}).items():
+            if n in self.stats:
+                self.stats[n].update({k: h[k] for k in ("ok", "latency_ms", "agree", "count") if k in h})
+        self._lock = threading.Lock()
+
+    def _ewma(self, name, key, x):
+        s = self.stats[name]
+        s[key] = HEALTH_DECAY * s[key] + (1 - HEALTH_DECAY) * x
+
+    def observe(self, name, ok: bool, latency_ms: float):
+        with self._lock:
+            s = self.stats[name]
+            self._ewma(name, "ok", 1.0 if ok else 0.0)
+            if s["count"] == 0:
+                s["latency_ms"] = float(latency_ms)
+            else:
+                self._ewma(name, "latency_ms", latency_ms)
+            s["count"] += 1
+
+    def agreement(self, name, share: float):
+        """share of this venue's bars within tolerance of the cross-venue median."""
+        with self._lock:
+            self._ewma(name, "agree", float(share))
+
+    def score(self, name) -> float:
+        s = self.stats[name]
+        return s["ok"] * s["agree"] * 1000.0 / (1000.0 + s["latency_ms"])
+
+    def ranked(self, names):
+        # stable: ties keep config order (primary first)
+        return sorted(names, key=lambda n: -self.score(n))
+
+class MultiVenueClient:
+    """
+    Data-only client exposing fetch_ohlcv, so it drops into stack_closes and
+    CandleStore unchanged. sources: {venue name: ccxt-like client}, primary first.
+    """
+
+    def __init__(self, sources: dict, budget_ms: float = 4000, fanout: int = None,
+                 tolerance_bps: float = 100.0, symbol_map: dict = None, health: dict = None,
+                 max_workers: int = 8):
+        self.sources = dict(sources)
+        self.names = list(self.sources)
+        self.budget_s = budget_ms / 1000.0
+        self.fanout = fanout or len(self.names)
+        self.tolerance_bps = tolerance_bps
+        self.symbol_map = symbol_map or {}
+        self.health = VenueHealth(self.names, health)
+        self.report = {"filled": 0, "appended": 0, "replaced": 0, "winner": {}}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    @classmethod
+    def from_config(cls, cfg: dict, primary_client, primary_name: str, health: dict = None):
+        """None unless data_sources.enabled; secondaries are public (no keys) ccxt clients."""
+        d = (cfg or {}).get("data_sources") or {}
+        if not d.get("enabled", False):
+            return None
+        sources = {primary_name: primary_client}
+        for name in d.get("venues") or []:
+            if name not in sources:
+                # answers after the budget are unused: don't wait on them longer
+                sources[name] = getattr(ccxt, name.lower())({"enableRateLimit": True,
+                                                             "timeout": int(d.get("budget_ms", 4000))})
+        return cls(sources, budget_ms=float(d.get("budget_ms", 4000)), fanout=d.get("fanout"),
+                   tolerance_bps=float(d.get("tolerance_bps", 100.0)),
+                   symbol_map=d.get("symbol_map"), health=health)
+
+    # ---------- fetch ----------
+    def _fetch_one(self, name, symbol, timeframe, since, limit):
+        """(rows, latency_ms); rows is None when the venue does not list the symbol."""
+        sym = (self.symbol_map.get(name) or {}).get(symbol, symbol)
+        t0 = time.monotonic()
+        try:
+            rows = self.sources[name].fetch_ohlcv(sym, timeframe=timeframe, since=since, limit=limit)
+        except ccxt.BadSymbol:
+            rows = None
+        return rows, (time.monotonic() - t0) * 1000
+
+    def fetch_ohlcv(self, symbol, timeframe="1d", since=None, limit=None):
+        venues = self.health.ranked(self.names)[:max(1, int(self.fanout))]
+        futs = {self._pool.submit(self._fetch_one, v, symbol, timeframe, since, limit): v for v in venues}
+        t0 = time.monotonic()
+        deadline = t0 + self.budget_s
+        results, winner, pending = {}, None, set(futs)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break  # budget spent
+            for f in done:
+                v = futs[f]
+                if f.exception() is not None:
+                    self.health.observe(v, False, (time.monotonic() - t0) * 1000)
+                    continue
+                rows, ms = f.result()
+                if rows is None:
+                    continue  # not listed there: not a health signal
+                self.health.observe(v, bool(rows), ms)
+                if rows:
+                    results[v] = rows
+                    winner = winner or v
+        for f in pending:
+            self.health.observe(futs[f], False, self.budget_s * 1000)  # missed the budget
+        if winner is None:
+            errors = [f.exception() for f in futs if f.done() and f.exception() is not None]
+            if errors and len(errors) == len(futs):
+                raise errors[0]  # every venue failed
+            if all(f.done() for f in futs):
+                return []  # answered, but nobody has bars
+            raise ccxt.RequestTimeout(f"no venue returned {symbol} {timeframe} within {self.budget_s:.1f}s")
+        self.report["winner"][winner] = self.report["winner"].get(winner, 0) + 1
+        return self._reconcile(winner, results, timeframe)
+
+    # ---------- reconcile ----------
+    def _reconcile(self, winner, results: dict, timeframe: str):
+        frames = {v: pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close", "volume"])
+                  .drop_duplicates("ts", keep="last").set_index("ts").sort_index()
+                  for v, rows in results.items()}
+        base = frames[winner]
+        others = [v for v in self.health.ranked(list(frames)) if v != winner]
+        if not others:
+            return _rows(base)
+
+        # expected grid from the winner's first bar to the current bucket
+        step = TIMEFRAME_MS[timeframe]
+        now_bucket = int(bucket_start(int(time.time() * 1000), timeframe))
+        grid = np.arange(int(base.index[0]), now_bucket + step, step, dtype=np.int64)
+        missing = np.setdiff1d(grid, base.index.to_numpy(dtype=np.int64))
+        if len(missing):
+            fill = []
+            for v in others:
+                rows = frames[v].reindex(missing).dropna()
+                fill.append(rows)
+                missing = np.setdiff1d(missing, rows.index.to_numpy(dtype=np.int64))
+            fill = pd.concat(fill)
+            if len(fill):
+                last = base.index[-1]
+                self.report["appended"] += int((fill.index > last).sum())
+                self.report["filled"] += int((fill.index <= last).sum())
+                base = pd.concat([base, fill]).sort_index()
+
+        # validate closes where at least two other venues quote the bar
+        closes = pd.DataFrame({v: frames[v]["close"] for v in others}).reindex(base.index)
+        quorum = closes.notna().sum(axis=1) >= 2
+        med = closes.median(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dev = (base["close"] / med - 1.0).abs() * 1e4
+        bad = quorum & (dev > self.tolerance_bps)
+        if quorum.any():
+            self.health.agreement(winner, 1.0 - float(bad[quorum].mean()))
+            dev_o = (closes.div(med, axis=0) - 1.0).abs() * 1e4
+            for v in others:
+                d = dev_o[v][quorum & closes[v].notna()]
+                if len(d):
+                    self.health.agreement(v, float((d <= self.tolerance_bps).mean()))
+        if bad.any():
+            # take the bar from the venue whose close is nearest the median
+            nearest = (closes[bad].sub(med[bad], axis=0)).abs().idxmin(axis=1)
+            for ts, v in nearest.items():
+                base.loc[ts] = frames[v].loc[ts]
+            self.report["replaced"] += int(bad.sum())
+        return _rows(base)
+
+    # ---------- reporting ----------
+    def health_state(self) -> dict:
+        return {n: {**s, "score": round(self.health.score(n), 4)} for n, s in self.health.stats.items()}
+
+    def format_report(self) -> str:
+        scores = ", ".join(f"{n}={self.health.score(n):.2f}" for n in self.names)
+        return (f"winners={self.report['winner']} filled={self.report['filled']} "
+                f"appended={self.report['appended']} replaced={self.report['replaced']} | health {scores}")
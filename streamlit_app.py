@@ -6,6 +6,8 @@ import pandas as pd
 import streamlit as st
 import ccxt
 
+from bot.risk import equity_series, risk_report, rolling_frame
+
 st.set_page_config(page_title="Quant Crypto Bot", layout="wide")
 st.title("🔁 Quant Crypto Rotation Bot — Dashboard")
 
@@ -100,4 +102,19 @@ if equity_history:
     except Exception as e:
         st.warning(f"Could not render equity history: {e}")
 
+    # --- Risk ---
+    eq = equity_series(equity_history)
+    if len(eq) >= 3:
+        st.subheader("Risk")
+        rep = risk_report(eq)
+        c1, c2, c3, c4, c5 = st.columns(5)
+        c1.metric("Sharpe", f"{rep['sharpe']:.2f}")
+        c2.metric("Sortino", f"{rep['sortino']:.2f}")
+        c3.metric(f"VaR {rep['alpha']:.0%}", f"{rep['var']:.2%}")
+        c4.metric(f"CVaR {rep['alpha']:.0%}", f"{rep['cvar']:.2%}")
+        c5.metric("Max DD", f"{rep['max_drawdown']:.2%}", f"{rep['max_dd_days']:.1f}d longest", delta_color="off")
+        roll = rolling_frame(eq, window=rep["window"])
+        st.line_chart(roll[["sharpe", "sortino"]])
+        st.area_chart(roll["drawdown"])
+
 st.caption("Tip: Deploy this dashboard on Streamlit Community Cloud and point it to this repo for a free hosted view.")
@@ -0,0 +1,156 @@
+# tests/test_scheduler.py
+# TWAP scheduler against a fake exchange on virtual time: spacing, failure
+# handling, resume after an interruption and serialized signed calls.
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from bot import scheduler
+from bot.candles import bucket_start
+from bot.scheduler import Clock, PENDING, SENT, DONE, FAILED, CANCELLED, UNKNOWN
+
+class SimClock(Clock):
+    """Virtual time: sleep advances the clock instantly."""
+
+    def __init__(self, start: float = 0.0):
+        self.t = float(start)
+
+    def now(self) -> float:
+        return self.t
+
+    async def sleep(self, seconds: float):
+        self.t += max(0.0, seconds)
+        await asyncio.sleep(0)
+
+class FakeExchange:
+    """
+    Stand-in for a ccxt client: fills market orders at a fixed price and logs
+    them with the clock time. fail = {symbol: n} fails that symbol's next n
+    orders. Overlapping create_order calls are counted (Kraken would reject
+    them with EAPI:Invalid nonce).
+    """
+
+    def __init__(self, prices: dict, clock: Clock = None, fail: dict = None, latency_s: float = 0.0):
+        self.prices = dict(prices)
+        self.clock = clock or Clock()
+        self.fail = dict(fail or {})
+        self.latency_s = latency_s
+        self.orders = []
+        self.overlaps = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def create_order(self, symbol, type_, side, amount, price=None, params=None):
+        with self._lock:
+            self._in_flight += 1
+            self.overlaps += self._in_flight > 1
+        try:
+            if self.latency_s:
+                time.sleep(self.latency_s)
+            if self.fail.get(symbol, 0) > 0:
+                self.fail[symbol] -= 1
+                raise RuntimeError(f"fake reject {symbol}")
+            o = {"id": str(len(self.orders) + 1), "symbol": symbol, "type": type_, "side": side,
+                 "amount": float(amount), "price": self.prices[symbol], "ts": self.clock.now()}
+            self.orders.append(o)
+            return o
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+PRICES = {"BTC/USD": 50000.0, "ETH/USD": 3000.0}
+
+def _schedule(clock, horizon_s=300.0):
+    parents = {"BTC/USD": ("buy", scheduler.child_amounts(0.4, 4)),
+               "ETH/USD": ("sell", scheduler.child_amounts(3.0, 2))}
+    return scheduler.build_schedule(parents, horizon_s, clock.now(), 0)
+
+# ---------- sizing ----------
+def test_child_amounts_slices_clip_and_min():
+    assert scheduler.child_amounts(1.0, 4) == [0.25] * 4
+    assert len(scheduler.child_amounts(1.0, 2, clip=0.3)) == 4  # clip forces more children
+    assert len(scheduler.child_amounts(1.0, 10, min_amount=0.3)) == 3  # fewer, none below min
+    assert scheduler.child_amounts(0.0, 4) == []
+    assert sum(scheduler.child_amounts(1.0, 3, clip=0.15)) == pytest.approx(1.0)
+
+# ---------- execution ----------
+def test_twap_spreads_children_over_horizon():
+    clock = SimClock(1000.0)
+    ex = FakeExchange(PRICES, clock)
+    sched = _schedule(clock)
+    done = scheduler.execute(ex, sched, clock=clock)
+    assert done == {DONE: 6}
+    assert not scheduler.pending(sched)
+    btc = [o["ts"] for o in ex.orders if o["symbol"] == "BTC/USD"]
+    eth = [o["ts"] for o in ex.orders if o["symbol"] == "ETH/USD"]
+    assert btc == [1000.0, 1075.0, 1150.0, 1225.0]  # 300s / 4 ticks
+    assert eth == [1000.0, 1075.0]
+    assert sum(o["amount"] for o in ex.orders if o["symbol"] == "BTC/USD") == pytest.approx(0.4)
+
+def test_failed_child_cancels_rest_of_parent_only():
+    clock = SimClock()
+    ex = FakeExchange(PRICES, clock, fail={"BTC/USD": 1})
+    sched = _schedule(clock)
+    seen = []
+    scheduler.execute(ex, sched, clock=clock, on_fill=lambda s, side, c, r: seen.append((s, c["status"])))
+    btc = [c["status"] for c in sched["orders"]["BTC/USD"]["children"]]
+    eth = [c["status"] for c in sched["orders"]["ETH/USD"]["children"]]
+    assert btc == [FAILED, CANCELLED, CANCELLED, CANCELLED]
+    assert eth == [DONE, DONE]
+    assert ("BTC/USD", FAILED) in seen
+    assert all(o["symbol"] == "ETH/USD" for o in ex.orders)
+
+def test_stops_when_not_allowed_and_keeps_rest_pending():
+    clock = SimClock()
+    ex = FakeExchange(PRICES, clock)
+    sched = _schedule(clock)
+    ticks = iter([True, True, True, False])  # before tick 1, before/after the first sleep, then stop
+    scheduler.execute(ex, sched, clock=clock, allowed=lambda: next(ticks, False))
+    assert len(ex.orders) == 4
+    assert scheduler.progress(sched) == {DONE: 4, PENDING: 2}
+
+def test_signed_calls_never_overlap():
+    clock = SimClock()
+    ex = FakeExchange(PRICES, clock, latency_s=0.02)
+    sched = _schedule(clock)
+    scheduler.execute(ex, sched, clock=clock, max_concurrent=4)
+    assert len(ex.orders) == 6
+    assert ex.overlaps == 0
+
+# ---------- resume ----------
+def test_prepare_resume_marks_in_flight_unknown():
+    clock = SimClock()
+    sched = _schedule(clock)
+    sched["orders"]["BTC/USD"]["children"][0]["status"] = SENT
+    assert scheduler.prepare_resume(sched) == 1
+    assert sched["orders"]["BTC/USD"]["children"][0]["status"] == UNKNOWN
+
+def test_resume_finishes_without_resending_in_flight(tmp_path, monkeypatch):
+    from bot import trade
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    clock = SimClock()
+    ex = FakeExchange(PRICES, clock)
+    sched = _schedule(clock, horizon_s=0.0)
+    sched["bar"] = int(bucket_start(int(time.time() * 1000), "1d"))
+    # interrupted run: first BTC child done, second sent but never confirmed
+    children = sched["orders"]["BTC/USD"]["children"]
+    children[0]["status"], children[1]["status"] = DONE, SENT
+    state = {"execution": sched}
+    path = str(tmp_path / "state.json")
+
+    assert trade._resume_schedule(state, path, ex, {}, logging.getLogger("test"))
+    assert [c["status"] for c in children] == [DONE, UNKNOWN, DONE, DONE]
+    assert [o["symbol"] for o in ex.orders].count("BTC/USD") == 2
+    assert state["execution"] is None  # nothing pending: schedule cleared
+
+def test_resume_drops_schedule_from_older_bar(tmp_path):
+    from bot import trade
+    clock = SimClock()
+    ex = FakeExchange(PRICES, clock)
+    state = {"execution": _schedule(clock)}  # bar 0
+    assert not trade._resume_schedule(state, str(tmp_path / "s.json"), ex, {}, logging.getLogger("test"))
+    assert state["execution"] is None
+    assert ex.orders == []